@@ -0,0 +1,47 @@
+"""
+Benchmarks the HTML-to-text backends in radar/html_text.py against the
+original BeautifulSoup implementation on the saved fixture pages.
+
+Usage: python benchmarks/html_text_bench.py [repeats]
+"""
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from radar.html_text import BACKENDS, etree
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+def load_fixtures():
+    pages = {}
+    for name in sorted(os.listdir(FIXTURES_DIR)):
+        if name.endswith('.html'):
+            with open(os.path.join(FIXTURES_DIR, name), 'r', encoding='utf-8') as f:
+                pages[name] = f.read()
+    return pages
+
+def time_backend(func, html, repeats, max_chars=None):
+    best = float('inf')
+    for _ in range(repeats):
+        started = time.perf_counter()
+        func(html, max_chars)
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+def main(repeats=20):
+    backends = [name for name in BACKENDS if name != 'lxml' or etree is not None]
+    pages = load_fixtures()
+
+    print(f"{'fixture':<28}{'KB':>8}" + ''.join(f"{name:>12}" for name in backends) + f"{backends[0] + '@10k':>12}  parity")
+    for name, html in pages.items():
+        reference = BACKENDS['bs4'](html)
+        timings = [time_backend(BACKENDS[b], html, repeats) for b in backends]
+        capped = time_backend(BACKENDS[backends[0]], html, repeats, max_chars=10000)
+        parity = all(BACKENDS[b](html) == reference for b in backends)
+        print(f"{name:<28}{len(html) / 1024:>8.1f}" + ''.join(f"{t:>10.2f}ms" for t in timings)
+              + f"{capped:>10.2f}ms  {'ok' if parity else 'DIFF'}")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
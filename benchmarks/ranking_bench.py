@@ -0,0 +1,79 @@
+"""
+Benchmarks RankingEngine end to end: rank() on pain-point dicts (column
+ingest + scoring + top k), rank_store() on a PainStore, and the scoring
+core on a prebuilt matrix. Checks the top k against a full sort.
+
+Usage: python benchmarks/ranking_bench.py [rows] [k] [store_rows]
+"""
+import os
+import sys
+import time
+import tempfile
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from radar.ranking import RankingEngine
+from radar.pain_store import PainStore
+
+def best_of(func, repeats):
+    best = float('inf')
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000, result
+
+def make_pain_points(engine, rows, rng, odd_values=(None, "7")):
+    """
+    Pain-point dicts shaped like PainAnalyzer output: int scores with 0.1%
+    of them replaced by `odd_values` (missing or string scores).
+    """
+    matrix = rng.integers(1, 11, size=(rows, len(engine.criteria))).tolist()
+    pain_points = [dict(zip(engine.criteria, values), problem=f"problem {i}") for i, values in enumerate(matrix)]
+    for i in rng.choice(rows, size=max(1, rows // 1000), replace=False).tolist():
+        pain_points[i][engine.criteria[i % len(engine.criteria)]] = odd_values[i % len(odd_values)]
+    return pain_points
+
+def main(rows=1_000_000, k=50, store_rows=100_000, repeats=3):
+    engine = RankingEngine()
+    rng = np.random.default_rng(0)
+    pain_points = make_pain_points(engine, rows, rng)
+    print(f"rows={rows:,} criteria={len(engine.criteria)} k={k}")
+
+    ingest_ms, matrix = best_of(lambda: engine.columns(pain_points), repeats)
+    rank_ms, ranked = best_of(lambda: engine.rank(pain_points, k), repeats)
+    top_ms, (indices, _) = best_of(lambda: engine.top_k(matrix, k), repeats)
+    scores = engine.scores(matrix)
+    sort_ms, order = best_of(lambda: np.argsort(-scores, kind='stable')[:k], repeats)
+    parity = np.allclose(scores[indices], scores[order]) and \
+        [p['opportunity_score'] for p in ranked] == [round(float(s), 4) for s in scores[indices]]
+
+    # Unparseable scores in every column force the value-by-value fallback
+    malformed = make_pain_points(engine, rows, rng, odd_values=(None, "7", "8/10"))
+    malformed_ms, _ = best_of(lambda: engine.rank(malformed, k), repeats)
+    del malformed
+
+    print(f"{'column ingest from dicts':<30}{ingest_ms:>10.2f}ms")
+    print(f"{'rank() end to end':<30}{rank_ms:>10.2f}ms")
+    print(f"{'rank() with malformed scores':<30}{malformed_ms:>10.2f}ms")
+    print(f"{'score + argpartition top k':<30}{top_ms:>10.2f}ms")
+    print(f"{'full argsort (reference)':<30}{sort_ms:>10.2f}ms")
+
+    if store_rows:
+        with tempfile.TemporaryDirectory() as tmp:
+            store = PainStore(os.path.join(tmp, 'bench.sqlite'))
+            store.upsert_pain_points(pain_points[:store_rows])
+            store_ms, top = best_of(lambda: engine.rank_store(store, k), repeats)
+            store.conn.close()
+        expected = engine.rank(pain_points[:store_rows], k)
+        parity = parity and [s for _, s in top] == [p['opportunity_score'] for p in expected]
+        print(f"{f'rank_store() ({store_rows:,} rows)':<30}{store_ms:>10.2f}ms")
+
+    print(f"parity: {'ok' if parity else 'DIFF'}")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 50,
+         int(sys.argv[3]) if len(sys.argv) > 3 else 100_000)
@@ -0,0 +1,80 @@
+"""
+Evaluates the local pain triage (radar/triage.py). The threshold is swept
+on the calibration split of triage_documents.jsonl (page-sized texts) and
+the configured threshold is then scored on the held-out split. Also reports
+how many saved fixture pages and their LLM chunks the triage drops, and its
+throughput.
+
+Usage: python benchmarks/triage_bench.py [threshold ...]
+"""
+import os
+import sys
+import json
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from radar.triage import PainTriage
+from radar.html_text import extract_text
+from radar.chunking import chunk_text
+from radar.parser import MAX_CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+def load_jsonl(name):
+    with open(os.path.join(FIXTURES_DIR, name), 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def load_pages():
+    pages = {}
+    for name in sorted(os.listdir(FIXTURES_DIR)):
+        if name.endswith('.html'):
+            with open(os.path.join(FIXTURES_DIR, name), 'r', encoding='utf-8') as f:
+                pages[name] = extract_text(f.read())
+    return pages
+
+def print_row(label, r):
+    print(f"{label:>12}{r['precision']:>11.3f}{r['recall']:>8.3f}{r['f1']:>7.3f}{r['kept_fraction']:>12.0%}")
+
+def main(thresholds=None):
+    triage = PainTriage()
+    documents = load_jsonl('triage_documents.jsonl')
+    split = {
+        name: ([d['text'] for d in documents if d['split'] == name], [d['label'] for d in documents if d['split'] == name])
+        for name in ('calibration', 'holdout')
+    }
+    thresholds = thresholds or sorted({0.4, 0.6, triage.threshold, 1.0, 1.5, 2.0})
+
+    texts, labels = split['calibration']
+    print(f"calibration: {len(texts)} documents, {sum(labels)} with pain points (configured threshold {triage.threshold})")
+    print(f"{'threshold':>12}{'precision':>11}{'recall':>8}{'f1':>7}{'sent to LLM':>13}")
+    for threshold in thresholds:
+        print_row(f"{threshold:.2f}", triage.evaluate(texts, labels, threshold))
+
+    texts, labels = split['holdout']
+    print(f"holdout: {len(texts)} documents, {sum(labels)} with pain points")
+    print_row(f"{triage.threshold:.2f}", triage.evaluate(texts, labels))
+
+    # One-sentence snippets the lexicon patterns were written against; not a held-out result
+    snippets = load_jsonl('triage_labeled.jsonl')
+    print(f"snippets (lexicon tuning data): {len(snippets)} texts")
+    print_row(f"{triage.threshold:.2f}", triage.evaluate([s['text'] for s in snippets], [s['label'] for s in snippets]))
+
+    pages = load_pages()
+    chunks = {name: chunk_text(text, MAX_CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS) for name, text in pages.items()}
+    page_scores = triage.scores(list(pages.values()))
+    dropped_pages = int((page_scores < triage.threshold).sum())
+    all_chunks = [chunk for name in pages for chunk in chunks[name]]
+    _, dropped_chunks = triage.split(all_chunks)
+    print(f"fixture pages: {dropped_pages} of {len(pages)} dropped, "
+          f"{len(dropped_chunks)} of {len(all_chunks)} chunks dropped "
+          f"(page scores {', '.join(f'{s:.1f}' for s in page_scores)})")
+
+    chars = sum(len(p) for p in pages.values())
+    started = time.perf_counter()
+    triage.scores(list(pages.values()))
+    elapsed = time.perf_counter() - started
+    print(f"throughput: {chars / 1024 / elapsed:,.0f} KB/s of text over {len(pages)} fixture pages")
+
+if __name__ == "__main__":
+    main([float(t) for t in sys.argv[1:]] or None)
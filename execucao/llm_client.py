@@ -0,0 +1,82 @@
+import os
+import weakref
+import asyncio
+import threading
+try:
+    from execucao.utils import setup_logger, load_env_file
+    from execucao.llm_transport import make_transport, make_async_transport, transport_mode
+except ImportError:
+    import sys
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from execucao.utils import setup_logger, load_env_file
+    from execucao.llm_transport import make_transport, make_async_transport, transport_mode
+
+import httpx
+from openai import OpenAI, AsyncOpenAI
+
+logger = setup_logger('LLMClient')
+load_env_file()
+
+try:
+    import h2  # noqa: F401 - enables HTTP/2 in httpx
+    HTTP2 = True
+except ImportError:
+    HTTP2 = False
+
+POOL_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=30.0)
+TIMEOUT = httpx.Timeout(60.0, connect=10.0)
+
+def _api_key():
+    # Replaying cassettes needs no real key
+    return os.getenv("OPENAI_API_KEY") or ('replay' if transport_mode() == 'replay' else None)
+
+_client = None
+_async_clients = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+def get_client():
+    """
+    Process-wide synchronous OpenAI client over one keep-alive (HTTP/2 when
+    h2 is installed) connection pool. Returns None if OPENAI_API_KEY is unset.
+    LLM_TRANSPORT=record/replay swaps in the cassette transport.
+    """
+    global _client
+    api_key = _api_key()
+    if not api_key:
+        return None
+    with _lock:
+        if _client is None:
+            _client = OpenAI(
+                api_key=api_key,
+                # Retries belong to the governor, which books every attempt against the budgets
+                max_retries=0,
+                http_client=httpx.Client(
+                    transport=make_transport(httpx.HTTPTransport(http2=HTTP2, limits=POOL_LIMITS)),
+                    timeout=TIMEOUT
+                )
+            )
+            logger.info(f"Shared OpenAI client initialized (http2={HTTP2}, transport={transport_mode()})")
+        return _client
+
+def get_async_client():
+    """
+    AsyncOpenAI client for the running event loop, sharing one connection pool
+    across every coroutine on that loop. Returns None if OPENAI_API_KEY is unset.
+    """
+    api_key = _api_key()
+    if not api_key:
+        return None
+    loop = asyncio.get_running_loop()
+    with _lock:
+        client = _async_clients.get(loop)
+        if client is None:
+            client = AsyncOpenAI(
+                api_key=api_key,
+                max_retries=0,
+                http_client=httpx.AsyncClient(
+                    transport=make_async_transport(httpx.AsyncHTTPTransport(http2=HTTP2, limits=POOL_LIMITS)),
+                    timeout=TIMEOUT
+                )
+            )
+            _async_clients[loop] = client
+        return client
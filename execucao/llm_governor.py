@@ -0,0 +1,320 @@
+import os
+import sys
+import time
+import asyncio
+import heapq
+import random
+import itertools
+import threading
+from collections import deque
+try:
+    from execucao.utils import setup_logger
+    from execucao.tokens import estimate_tokens
+    from execucao.llm_metrics import get_recorder
+except ImportError:
+    import sys
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from execucao.utils import setup_logger
+    from execucao.tokens import estimate_tokens
+    from execucao.llm_metrics import get_recorder
+
+logger = setup_logger('LLMGovernor')
+
+# Lower rank is served first when callers are waiting for budget
+PRIORITIES = {
+    'copy': 0,        # Landing page copy (user facing)
+    'analysis': 1,    # Competitor analysis
+    'background': 2   # Radar extraction, scoring and clustering
+}
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+# Completion size assumed when the caller does not set max_tokens
+DEFAULT_COMPLETION_TOKENS = 500
+
+WINDOW_SECONDS = 60.0
+
+# How often a waiting coroutine re-checks its place in line
+ASYNC_POLL_SECONDS = 0.05
+
+def _is_retryable(error):
+    status = getattr(error, 'status_code', None)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    # Connection errors and timeouts carry no status code
+    return type(error).__name__ in ('APIConnectionError', 'APITimeoutError')
+
+def _retry_after(error):
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        return float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+def _call_site(depth=2):
+    """
+    'module:Class.method' of the code that called chat()/achat().
+    """
+    frame = sys._getframe(depth)
+    code = frame.f_code
+    module = frame.f_globals.get('__name__', '?')
+    return f"{module}:{getattr(code, 'co_qualname', code.co_name)}"
+
+def estimate_request_tokens(kwargs):
+    """
+    Prompt tokens plus the completion budget for a chat.completions request.
+    """
+    model = kwargs.get('model', 'gpt-3.5-turbo')
+    prompt = sum(estimate_tokens(str(m.get('content', '')), model) + 4 for m in kwargs.get('messages', []))
+    return prompt + (kwargs.get('max_tokens') or DEFAULT_COMPLETION_TOKENS)
+
+
+class LLMGovernor:
+    """
+    Process-wide gate in front of every chat.completions call. Enforces
+    requests-per-minute and tokens-per-minute budgets over a sliding window,
+    serves waiting callers by priority class, retries 429/5xx responses with
+    jittered exponential backoff and keeps queue-wait metrics.
+    """
+    def __init__(self, requests_per_minute=500, tokens_per_minute=160000, max_retries=5,
+                 base_delay=1.0, max_delay=30.0):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self._cond = threading.Condition()
+        self._window = deque()  # [timestamp, tokens] per admitted request
+        self._window_tokens = 0
+        self._waiters = []
+        self._seq = itertools.count()
+
+        self.recorder = get_recorder()
+        self._metrics = {
+            name: {'calls': 0, 'retries': 0, 'failures': 0, 'waits': deque(maxlen=1000)}
+            for name in PRIORITIES
+        }
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            requests_per_minute=int(os.getenv('LLM_REQUESTS_PER_MINUTE', 500)),
+            tokens_per_minute=int(os.getenv('LLM_TOKENS_PER_MINUTE', 160000)),
+            max_retries=int(os.getenv('LLM_MAX_RETRIES', 5))
+        )
+
+    def _expire(self, now):
+        while self._window and now - self._window[0][0] >= WINDOW_SECONDS:
+            self._window_tokens -= self._window.popleft()[1]
+
+    def _budget_wait(self, tokens, now):
+        """
+        Seconds until a request of `tokens` fits both budgets (0 if it fits now).
+        Caller must hold the condition.
+        """
+        self._expire(now)
+        if not self._window:
+            return 0.0
+        fits_requests = len(self._window) < self.requests_per_minute
+        fits_tokens = self._window_tokens + tokens <= self.tokens_per_minute
+        if fits_requests and fits_tokens:
+            return 0.0
+        # Wait for the oldest admitted request to leave the window
+        return max(0.01, WINDOW_SECONDS - (now - self._window[0][0]))
+
+    def _admit(self, ticket, tokens):
+        """
+        Admits `ticket` if it is first in line and the budgets allow.
+        Returns (window_entry, 0) when admitted, else (None, seconds to wait;
+        None while other tickets are ahead). Caller must hold the condition.
+        """
+        if self._waiters[0] != ticket:
+            return None, None
+        now = time.monotonic()
+        wait = self._budget_wait(tokens, now)
+        if wait:
+            return None, wait
+        heapq.heappop(self._waiters)
+        entry = [now, tokens]
+        self._window.append(entry)
+        self._window_tokens += tokens
+        self._cond.notify_all()
+        return entry, 0
+
+    def _withdraw(self, ticket):
+        """
+        Removes a ticket that gave up waiting. Caller must hold the condition.
+        """
+        if ticket in self._waiters:
+            self._waiters.remove(ticket)
+            heapq.heapify(self._waiters)
+            self._cond.notify_all()
+
+    def acquire(self, tokens, priority='background'):
+        """
+        Blocks until the request may be sent. Returns (window_entry, seconds waited).
+        """
+        ticket = (PRIORITIES[priority], next(self._seq))
+        started = time.monotonic()
+        with self._cond:
+            heapq.heappush(self._waiters, ticket)
+            while True:
+                entry, wait = self._admit(ticket, tokens)
+                if entry:
+                    break
+                self._cond.wait(timeout=wait)
+        waited = time.monotonic() - started
+        with self._cond:
+            self._metrics[priority]['waits'].append(waited)
+        return entry, waited
+
+    async def aacquire(self, tokens, priority='background'):
+        """
+        Event-loop counterpart of acquire(). Admission happens under the lock
+        with no await in between, so a cancelled waiter never holds a slot;
+        its ticket is withdrawn so the callers behind it move up.
+        """
+        ticket = (PRIORITIES[priority], next(self._seq))
+        started = time.monotonic()
+        with self._cond:
+            heapq.heappush(self._waiters, ticket)
+        try:
+            while True:
+                with self._cond:
+                    entry, wait = self._admit(ticket, tokens)
+                if entry:
+                    break
+                # Threads are woken by the condition; coroutines poll it
+                await asyncio.sleep(ASYNC_POLL_SECONDS if wait is None else min(wait, ASYNC_POLL_SECONDS * 5))
+        except BaseException:
+            with self._cond:
+                self._withdraw(ticket)
+            raise
+        waited = time.monotonic() - started
+        with self._cond:
+            self._metrics[priority]['waits'].append(waited)
+        return entry, waited
+
+    def settle(self, entry, actual_tokens):
+        """
+        Replaces the estimated token count of an admitted request with the real usage.
+        """
+        if actual_tokens is None:
+            return
+        with self._cond:
+            if entry in self._window:
+                self._window_tokens += actual_tokens - entry[1]
+            entry[1] = actual_tokens
+            self._cond.notify_all()
+
+    def _backoff(self, attempt, error):
+        delay = _retry_after(error)
+        if delay is None:
+            # Full jitter: uniform in [0, base * 2^attempt], capped
+            delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        return delay
+
+    def _after_failure(self, entry, attempt, error, priority, call):
+        """
+        Books a failed attempt. Returns the delay before retrying, or re-raises
+        when the error is not retryable or retries are exhausted.
+        """
+        call_site, model, started, waited = call
+        self.recorder.record(call_site, model, priority, time.monotonic() - started, waited,
+                             outcome=type(error).__name__, attempt=attempt + 1)
+        # Rejected calls still count as requests but not as tokens
+        self.settle(entry, 0)
+        if not _is_retryable(error) or attempt == self.max_retries:
+            with self._cond:
+                self._metrics[priority]['failures'] += 1
+            raise error
+        delay = self._backoff(attempt, error)
+        with self._cond:
+            self._metrics[priority]['retries'] += 1
+        logger.warning(f"LLM call failed ({error}). Retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+        return delay
+
+    def _after_success(self, entry, response, priority, call, attempt):
+        call_site, model, started, waited = call
+        usage = getattr(response, 'usage', None)
+        self.recorder.record(call_site, model, priority, time.monotonic() - started, waited,
+                             usage=usage, attempt=attempt + 1)
+        self.settle(entry, getattr(usage, 'total_tokens', None))
+        with self._cond:
+            self._metrics[priority]['calls'] += 1
+        return response
+
+    def chat(self, client, priority='background', **kwargs):
+        """
+        Governed replacement for client.chat.completions.create(**kwargs).
+        Raises the last error once retries are exhausted or for non-retryable errors.
+        """
+        tokens = estimate_request_tokens(kwargs)
+        call_site = _call_site()
+        for attempt in range(self.max_retries + 1):
+            entry, waited = self.acquire(tokens, priority)
+            call = (call_site, kwargs.get('model', ''), time.monotonic(), waited)
+            try:
+                response = client.chat.completions.create(**kwargs)
+            except Exception as e:
+                time.sleep(self._after_failure(entry, attempt, e, priority, call))
+                continue
+            return self._after_success(entry, response, priority, call, attempt)
+
+    async def achat(self, client, priority='background', **kwargs):
+        """
+        Async counterpart of chat() for AsyncOpenAI clients. Budget waits are
+        awaited on the event loop, so they need no worker threads and a
+        cancelled call releases its place in line.
+        """
+        tokens = estimate_request_tokens(kwargs)
+        call_site = _call_site()
+        for attempt in range(self.max_retries + 1):
+            entry, waited = await self.aacquire(tokens, priority)
+            call = (call_site, kwargs.get('model', ''), time.monotonic(), waited)
+            try:
+                response = await client.chat.completions.create(**kwargs)
+            except Exception as e:
+                await asyncio.sleep(self._after_failure(entry, attempt, e, priority, call))
+                continue
+            return self._after_success(entry, response, priority, call, attempt)
+
+    def metrics(self):
+        """
+        Snapshot of budget usage and per-priority queue-wait statistics.
+        """
+        with self._cond:
+            self._expire(time.monotonic())
+            report = {
+                'window_requests': len(self._window),
+                'window_tokens': self._window_tokens,
+                'waiting': len(self._waiters),
+                'priorities': {}
+            }
+            for name, m in self._metrics.items():
+                waits = sorted(m['waits'])
+                report['priorities'][name] = {
+                    'calls': m['calls'],
+                    'retries': m['retries'],
+                    'failures': m['failures'],
+                    'wait_p50': waits[len(waits) // 2] if waits else 0.0,
+                    'wait_p95': waits[int(len(waits) * 0.95)] if waits else 0.0,
+                    'wait_max': waits[-1] if waits else 0.0
+                }
+        return report
+
+
+_governor = None
+_governor_lock = threading.Lock()
+
+def get_governor():
+    """
+    The process-wide governor, configured from LLM_* environment variables.
+    """
+    global _governor
+    with _governor_lock:
+        if _governor is None:
+            _governor = LLMGovernor.from_env()
+        return _governor
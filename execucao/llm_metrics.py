@@ -0,0 +1,151 @@
+import os
+import json
+import time
+import bisect
+import logging
+import threading
+from logging.handlers import RotatingFileHandler
+from collections import Counter
+
+LOG_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'logs')
+
+# USD per 1M tokens (prompt, completion)
+MODEL_PRICES = {
+    'gpt-3.5-turbo': (0.50, 1.50),
+    'gpt-4o-mini': (0.15, 0.60),
+    'gpt-4o': (2.50, 10.00),
+    'gpt-4-turbo': (10.00, 30.00),
+    'gpt-4': (30.00, 60.00)
+}
+
+# Upper bounds (seconds) of the latency histogram buckets; the last bucket is open-ended
+LATENCY_BUCKETS = [0.25, 0.5, 1, 2, 4, 8, 16, 32, 64]
+
+def estimate_cost(model, prompt_tokens, completion_tokens):
+    # Longest matching prefix so dated snapshots (gpt-4o-2024-08-06) resolve to their family
+    family = max((name for name in MODEL_PRICES if model.startswith(name)), key=len, default=None)
+    if family is None:
+        return 0.0
+    prompt_price, completion_price = MODEL_PRICES[family]
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1000000
+
+
+class _SiteStats:
+    def __init__(self):
+        self.calls = 0
+        self.outcomes = Counter()
+        self.histogram = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.wall_seconds = 0.0
+        self.queue_seconds = 0.0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost = 0.0
+        self.models = Counter()
+
+    def percentile(self, pct):
+        """
+        Latency percentile estimated from the histogram (bucket upper bound).
+        """
+        if not self.calls:
+            return 0.0
+        target = pct / 100.0 * self.calls
+        seen = 0
+        for i, count in enumerate(self.histogram):
+            seen += count
+            if seen >= target:
+                return LATENCY_BUCKETS[i] if i < len(LATENCY_BUCKETS) else float('inf')
+        return float('inf')
+
+
+class LLMCallRecorder:
+    """
+    Records one line per chat.completions attempt (wall time, queue wait,
+    tokens, cost, model, call site, outcome) to a rotating JSONL file and
+    keeps running per-call-site histograms for snapshot().
+    """
+    def __init__(self, log_file=None, max_bytes=5 * 1024 * 1024, backup_count=5):
+        self.log_file = log_file or os.path.join(LOG_DIR, 'llm_calls.jsonl')
+        os.makedirs(os.path.dirname(self.log_file), exist_ok=True)
+        self._lock = threading.Lock()
+        self._sites = {}
+        self.started_at = time.time()
+
+        self._log = logging.getLogger(f'LLMCalls:{self.log_file}')
+        self._log.setLevel(logging.INFO)
+        self._log.propagate = False
+        if not self._log.handlers:
+            handler = RotatingFileHandler(self.log_file, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            self._log.addHandler(handler)
+
+    def record(self, call_site, model, priority, wall_seconds, queue_seconds=0.0, usage=None,
+               outcome='ok', attempt=1):
+        prompt_tokens = getattr(usage, 'prompt_tokens', 0) or 0
+        completion_tokens = getattr(usage, 'completion_tokens', 0) or 0
+        cost = estimate_cost(model, prompt_tokens, completion_tokens)
+
+        with self._lock:
+            stats = self._sites.setdefault(call_site, _SiteStats())
+            stats.calls += 1
+            stats.outcomes[outcome] += 1
+            stats.histogram[bisect.bisect_left(LATENCY_BUCKETS, wall_seconds)] += 1
+            stats.wall_seconds += wall_seconds
+            stats.queue_seconds += queue_seconds
+            stats.prompt_tokens += prompt_tokens
+            stats.completion_tokens += completion_tokens
+            stats.cost += cost
+            stats.models[model] += 1
+
+        self._log.info(json.dumps({
+            'timestamp': time.time(),
+            'call_site': call_site,
+            'model': model,
+            'priority': priority,
+            'attempt': attempt,
+            'outcome': outcome,
+            'wall_seconds': round(wall_seconds, 4),
+            'queue_seconds': round(queue_seconds, 4),
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'cost_usd': round(cost, 6)
+        }))
+
+    def snapshot(self):
+        """
+        Per-call-site totals, latency histogram and percentiles since startup.
+        """
+        with self._lock:
+            report = {}
+            for site, s in self._sites.items():
+                report[site] = {
+                    'calls': s.calls,
+                    'outcomes': dict(s.outcomes),
+                    'models': dict(s.models),
+                    'wall_seconds_total': round(s.wall_seconds, 3),
+                    'wall_seconds_mean': round(s.wall_seconds / s.calls, 3),
+                    'latency_p50': s.percentile(50),
+                    'latency_p95': s.percentile(95),
+                    'latency_histogram': dict(zip([f"<={b}s" for b in LATENCY_BUCKETS] + [f">{LATENCY_BUCKETS[-1]}s"], s.histogram)),
+                    'queue_seconds_total': round(s.queue_seconds, 3),
+                    'prompt_tokens': s.prompt_tokens,
+                    'completion_tokens': s.completion_tokens,
+                    'cost_usd': round(s.cost, 6)
+                }
+        return report
+
+
+_recorder = None
+_recorder_lock = threading.Lock()
+
+def get_recorder():
+    """
+    Process-wide recorder written to logs/llm_calls.jsonl.
+    """
+    global _recorder
+    with _recorder_lock:
+        if _recorder is None:
+            _recorder = LLMCallRecorder()
+        return _recorder
+
+def snapshot():
+    return get_recorder().snapshot()
@@ -0,0 +1,250 @@
+"""
+Record/replay transport for the OpenAI clients in execucao/llm_client.py.
+
+LLM_TRANSPORT=record  forwards requests to the API and saves each
+                      request/response pair as a cassette file
+                      (408/429 and 5xx answers are not recorded).
+LLM_TRANSPORT=replay  answers from the cassettes without network access.
+                      LLM_REPLAY_LATENCY is 'recorded' (default: sleep as
+                      long as the original call, scaled by
+                      LLM_REPLAY_SPEED) or a fixed number of seconds.
+
+The same cassettes can be served over HTTP by an OpenAI-compatible stub:
+    python execucao/llm_transport.py serve --port 8089
+    OPENAI_BASE_URL=http://127.0.0.1:8089/v1 python ...
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import hashlib
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+try:
+    from execucao.utils import setup_logger
+except ImportError:
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from execucao.utils import setup_logger
+
+logger = setup_logger('LLMTransport')
+
+DEFAULT_CASSETTE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'temp', 'llm_cassettes')
+
+# Headers that describe the wire encoding, not the decoded body we store
+_DROP_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'connection'}
+
+# Transient failures; replaying them would reproduce the outage forever
+_UNRECORDED_STATUS = {408, 429}
+
+def transport_mode():
+    return os.getenv('LLM_TRANSPORT', 'live').lower()
+
+
+class CassetteLibrary:
+    """
+    One JSON file per request, named by a hash of the endpoint and canonical body.
+    """
+    def __init__(self, cassette_dir=None):
+        self.cassette_dir = cassette_dir or os.getenv('LLM_CASSETTE_DIR') or DEFAULT_CASSETTE_DIR
+        os.makedirs(self.cassette_dir, exist_ok=True)
+
+    @staticmethod
+    def key_for(method, path, body):
+        # '/v1/chat/completions' and '/chat/completions' hit the same cassette
+        endpoint = path[3:] if path.startswith('/v1/') else path
+        try:
+            body = json.dumps(json.loads(body or b'{}'), sort_keys=True)
+        except ValueError:
+            body = (body or b'').decode('utf-8', errors='replace')
+        return hashlib.sha256(f"{method.upper()} {endpoint}\n{body}".encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cassette_dir, f"{key}.json")
+
+    def save(self, key, request_body, status, headers, content, latency):
+        try:
+            body = json.loads(content)
+        except ValueError:
+            body = content.decode('utf-8', errors='replace')
+        cassette = {
+            'request': json.loads(request_body or b'{}'),
+            'response': {
+                'status': status,
+                'headers': _decoded_headers(headers),
+                'body': body
+            },
+            'latency': latency
+        }
+        tmp_path = self._path(key) + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(cassette, f)
+        os.replace(tmp_path, self._path(key))
+
+    def load(self, key):
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+
+def _decoded_headers(headers):
+    return {k: v for k, v in headers.items() if k.lower() not in _DROP_HEADERS}
+
+def _record(library, request, body, response, content, latency):
+    """
+    Saves a live exchange as a cassette and rebuilds the response around the
+    already-decoded body (without the wire-encoding headers, or httpx would
+    decompress it twice). Throttling and server errors are passed through
+    unrecorded.
+    """
+    status = response.status_code
+    if status in _UNRECORDED_STATUS or status >= 500:
+        logger.warning(f"Not recording {status} response for {request.url.path}")
+    else:
+        library.save(library.key_for(request.method, request.url.path, body), body,
+                     status, response.headers, content, latency)
+    return httpx.Response(status, headers=_decoded_headers(response.headers), content=content, request=request)
+
+def _replay_delay(cassette):
+    setting = os.getenv('LLM_REPLAY_LATENCY', 'recorded')
+    if setting == 'recorded':
+        return cassette.get('latency', 0.0) / float(os.getenv('LLM_REPLAY_SPEED', 1.0))
+    return float(setting)
+
+def _replay_payload(cassette, key):
+    """
+    (status, headers, body bytes) for a cassette, or an OpenAI-style 404 on a miss.
+    """
+    if cassette is None:
+        logger.error(f"No cassette for request {key[:12]}")
+        error = {'error': {'message': f'No recorded response for request {key}', 'type': 'cassette_miss', 'code': None}}
+        return 404, {'content-type': 'application/json'}, json.dumps(error).encode('utf-8')
+    response = cassette['response']
+    body = response['body']
+    content = body.encode('utf-8') if isinstance(body, str) else json.dumps(body).encode('utf-8')
+    return response['status'], response['headers'], content
+
+
+class RecordingTransport(httpx.BaseTransport):
+    def __init__(self, inner, library):
+        self.inner = inner
+        self.library = library
+
+    def handle_request(self, request):
+        body = request.read()
+        started = time.monotonic()
+        response = self.inner.handle_request(request)
+        content = response.read()
+        latency = time.monotonic() - started
+        return _record(self.library, request, body, response, content, latency)
+
+    def close(self):
+        self.inner.close()
+
+
+class ReplayTransport(httpx.BaseTransport):
+    def __init__(self, library):
+        self.library = library
+
+    def handle_request(self, request):
+        key = self.library.key_for(request.method, request.url.path, request.read())
+        cassette = self.library.load(key)
+        if cassette:
+            time.sleep(_replay_delay(cassette))
+        status, headers, content = _replay_payload(cassette, key)
+        return httpx.Response(status, headers=headers, content=content, request=request)
+
+
+class AsyncRecordingTransport(httpx.AsyncBaseTransport):
+    def __init__(self, inner, library):
+        self.inner = inner
+        self.library = library
+
+    async def handle_async_request(self, request):
+        body = await request.aread()
+        started = time.monotonic()
+        response = await self.inner.handle_async_request(request)
+        content = await response.aread()
+        latency = time.monotonic() - started
+        return _record(self.library, request, body, response, content, latency)
+
+    async def aclose(self):
+        await self.inner.aclose()
+
+
+class AsyncReplayTransport(httpx.AsyncBaseTransport):
+    def __init__(self, library):
+        self.library = library
+
+    async def handle_async_request(self, request):
+        key = self.library.key_for(request.method, request.url.path, await request.aread())
+        cassette = self.library.load(key)
+        if cassette:
+            await asyncio.sleep(_replay_delay(cassette))
+        status, headers, content = _replay_payload(cassette, key)
+        return httpx.Response(status, headers=headers, content=content, request=request)
+
+
+def make_transport(inner):
+    """
+    Wraps a live httpx transport according to LLM_TRANSPORT.
+    """
+    mode = transport_mode()
+    if mode == 'record':
+        return RecordingTransport(inner, CassetteLibrary())
+    if mode == 'replay':
+        return ReplayTransport(CassetteLibrary())
+    return inner
+
+def make_async_transport(inner):
+    mode = transport_mode()
+    if mode == 'record':
+        return AsyncRecordingTransport(inner, CassetteLibrary())
+    if mode == 'replay':
+        return AsyncReplayTransport(CassetteLibrary())
+    return inner
+
+
+def serve(host='127.0.0.1', port=8089, cassette_dir=None):
+    """
+    OpenAI-compatible stub server answering from the cassettes.
+    """
+    library = CassetteLibrary(cassette_dir)
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            key = library.key_for('POST', self.path, body)
+            cassette = library.load(key)
+            if cassette:
+                time.sleep(_replay_delay(cassette))
+            status, headers, content = _replay_payload(cassette, key)
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header('Content-Length', str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        def log_message(self, format, *args):
+            logger.info(f"Stub {self.address_string()} {format % args}")
+
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    logger.info(f"Serving cassettes from {library.cassette_dir} on http://{host}:{port}/v1")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="LLM cassette stub server")
+    parser.add_argument('command', choices=['serve'])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--cassettes', default=None)
+    args = parser.parse_args()
+    serve(args.host, args.port, args.cassettes)
@@ -0,0 +1,27 @@
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Rough average for English text when tiktoken is unavailable
+CHARS_PER_TOKEN = 4
+
+_encodings = {}
+
+def _encoding(model):
+    if model not in _encodings:
+        try:
+            _encodings[model] = tiktoken.encoding_for_model(model)
+        except KeyError:
+            _encodings[model] = tiktoken.get_encoding("cl100k_base")
+    return _encodings[model]
+
+def estimate_tokens(text, model="gpt-3.5-turbo"):
+    """
+    Token count for `text`: exact with tiktoken installed, otherwise a character-based estimate.
+    """
+    if not text:
+        return 0
+    if tiktoken is not None:
+        return len(_encoding(model).encode(text, disallowed_special=()))
+    return len(text) // CHARS_PER_TOKEN + 1
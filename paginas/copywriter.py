@@ -2,38 +2,66 @@ import os
 import json
 try:
     from execucao.utils import setup_logger, load_env_file
+    from execucao.llm_governor import get_governor
+    from execucao.llm_client import get_client, get_async_client
 except ImportError:
     import sys
     sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
     from execucao.utils import setup_logger, load_env_file
-
-from openai import OpenAI
+    from execucao.llm_governor import get_governor
+    from execucao.llm_client import get_client, get_async_client
 
 logger = setup_logger('CopywriterAgent')
 load_env_file()
 
 class Copywriter:
     def __init__(self):
-        api_key = os.getenv("OPENAI_API_KEY")
-        self.client = OpenAI(api_key=api_key) if api_key else None
+        self.client = get_client()
+        self.governor = get_governor()
 
     def generate_copy(self, product_info, pain_info):
         """
         Generates sales copy for the landing page.
         """
         if not self.client:
-            # Fallback for testing without API
-            return {
-                "headline": "Stop Spending Hours on Monthly Reports",
-                "subheadline": "Automate your bank-to-excel workflow in seconds with our simple script.",
-                "pain_agitation": "Are you tired of manually copying data from PDF bank statements and making expensive errors?",
-                "solution_promise": "Our Python Converter does it for you instantly, with 100% accuracy.",
-                "benefits": ["Save 10+ hours per month", "Eliminate copy-paste errors", "No coding skills required"],
-                "features": ["Drag & Drop Interface", "Supports all major banks", "Export to CSV/XLSX"],
-                "cta_text": "Get Instant Access - $9",
-                "pricing_text": "Only $9 (One-time payment)"
-            }
+            return self._fallback_copy()
+
+        try:
+            response = self.governor.chat(self.client, priority='copy', **self._copy_request(product_info, pain_info))
+            return json.loads(response.choices[0].message.content)
+        except Exception as e:
+            logger.error(f"Error generating copy: {e}")
+            raise  # Re-raise in production instead of falling back to MOCK
+
+    async def generate_copy_async(self, product_info, pain_info):
+        """
+        Async variant of generate_copy() on the shared AsyncOpenAI client.
+        """
+        if not self.client:
+            return self._fallback_copy()
+
+        try:
+            response = await self.governor.achat(get_async_client(), priority='copy', **self._copy_request(product_info, pain_info))
+            return json.loads(response.choices[0].message.content)
+        except Exception as e:
+            logger.error(f"Error generating copy: {e}")
+            raise  # Re-raise in production instead of falling back to MOCK
+
+    @staticmethod
+    def _fallback_copy():
+        # Fallback for testing without API
+        return {
+            "headline": "Stop Spending Hours on Monthly Reports",
+            "subheadline": "Automate your bank-to-excel workflow in seconds with our simple script.",
+            "pain_agitation": "Are you tired of manually copying data from PDF bank statements and making expensive errors?",
+            "solution_promise": "Our Python Converter does it for you instantly, with 100% accuracy.",
+            "benefits": ["Save 10+ hours per month", "Eliminate copy-paste errors", "No coding skills required"],
+            "features": ["Drag & Drop Interface", "Supports all major banks", "Export to CSV/XLSX"],
+            "cta_text": "Get Instant Access - $9",
+            "pricing_text": "Only $9 (One-time payment)"
+        }
 
+    def _copy_request(self, product_info, pain_info):
         prompt = f"""
         Write high-converting sales copy for a landing page.
         
@@ -55,17 +83,11 @@ class Copywriter:
 
         Tone: Professional, urgent, persuasive.
         """
-        
-        try:
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are a world-class direct response copywriter."},
-                    {"role": "user", "content": prompt}
-                ],
-                response_format={ "type": "json_object" }
-            )
-            return json.loads(response.choices[0].message.content)
-        except Exception as e:
-            logger.error(f"Error generating copy: {e}")
-            raise  # Re-raise in production instead of falling back to MOCK
+        return dict(
+            model="gpt-3.5-turbo",
+            messages=[
+                {"role": "system", "content": "You are a world-class direct response copywriter."},
+                {"role": "user", "content": prompt}
+            ],
+            response_format={ "type": "json_object" }
+        )
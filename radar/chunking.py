@@ -0,0 +1,73 @@
+import re
+try:
+    from execucao.tokens import estimate_tokens
+except ImportError:
+    import sys
+    import os
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from execucao.tokens import estimate_tokens
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+def _slices(text, max_tokens):
+    """
+    Character slices of `text` within the budget, for runs without whitespace
+    (CJK text, minified JSON, base64, long URLs).
+    """
+    tokens = estimate_tokens(text)
+    if tokens <= max_tokens:
+        yield text
+        return
+    size = max(1, len(text) * max_tokens // tokens)
+    for i in range(0, len(text), size):
+        yield from _slices(text[i:i + size], max_tokens)
+
+def _units(text, max_tokens):
+    """
+    Splits text into lines, then sentences, then word runs, then character
+    slices, so that no single unit exceeds the chunk budget.
+    """
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if estimate_tokens(line) <= max_tokens:
+            yield line
+            continue
+        for sentence in _SENTENCE_END.split(line):
+            if estimate_tokens(sentence) <= max_tokens:
+                yield sentence
+                continue
+            words = sentence.split()
+            step = max(1, len(words) * max_tokens // estimate_tokens(sentence))
+            for i in range(0, len(words), step):
+                yield from _slices(' '.join(words[i:i + step]), max_tokens)
+
+def chunk_text(text, max_tokens=2500, overlap_tokens=150):
+    """
+    Packs text into chunks of at most `max_tokens`, each starting with roughly
+    `overlap_tokens` of the previous chunk's tail so statements cut at a
+    boundary still appear whole in one chunk.
+    """
+    chunks = []
+    current, current_tokens = [], 0
+
+    for unit in _units(text, max_tokens - overlap_tokens):
+        unit_tokens = estimate_tokens(unit)
+        if current and current_tokens + unit_tokens > max_tokens:
+            chunks.append('\n'.join(current))
+            # Carry the tail of this chunk into the next one
+            tail, tail_tokens = [], 0
+            for previous in reversed(current):
+                previous_tokens = estimate_tokens(previous)
+                if tail_tokens + previous_tokens > overlap_tokens:
+                    break
+                tail.insert(0, previous)
+                tail_tokens += previous_tokens
+            current, current_tokens = tail, tail_tokens
+        current.append(unit)
+        current_tokens += unit_tokens
+
+    if current:
+        chunks.append('\n'.join(current))
+    return chunks
@@ -0,0 +1,131 @@
+import re
+from collections import Counter
+
+import numpy as np
+
+STOP_WORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being below between both but by
+can could did do does doing down during each few for from further had has have having he her here hers him his how i if
+in into is it its itself just me more most my no nor not now of off on once only or other our out over own same she
+should so some such than that the their them then there these they this those through to too under until up very was
+we were what when where which while who whom why will with would you your yours also get got really much even still
+every like want wish need one thing things lot way time
+""".split())
+
+_TOKEN = re.compile(r"[a-z][a-z0-9+#'-]{1,}")
+
+def tokenize(text):
+    return [t for t in _TOKEN.findall(text.lower()) if t not in STOP_WORDS]
+
+
+def pain_text(pain):
+    return f"{pain.get('problem', '')} {pain.get('context', '')}"
+
+
+def score_value(value):
+    """
+    A model-supplied score as a float; missing, non-numeric ("8/10") or
+    non-finite values count as 0.
+    """
+    if isinstance(value, bool):
+        return 0.0
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return value if np.isfinite(value) else 0.0
+
+
+def tfidf_matrix(documents, max_features=2000):
+    """
+    L2-normalized TF-IDF matrix (float32, documents x terms) over the
+    `max_features` terms with the highest document frequency.
+    Returns (matrix, vocabulary list).
+    """
+    tokenized = [tokenize(doc) for doc in documents]
+    df = Counter(term for tokens in tokenized for term in set(tokens))
+    # Sort by frequency then term so the vocabulary is identical on every run
+    vocabulary = [term for term, _ in sorted(df.items(), key=lambda kv: (-kv[1], kv[0]))[:max_features]]
+    index = {term: i for i, term in enumerate(vocabulary)}
+
+    matrix = np.zeros((len(documents), len(vocabulary)), dtype=np.float32)
+    for row, tokens in enumerate(tokenized):
+        for term, count in Counter(tokens).items():
+            col = index.get(term)
+            if col is not None:
+                matrix[row, col] = count
+
+    if vocabulary:
+        doc_freq = np.array([df[term] for term in vocabulary], dtype=np.float32)
+        idf = np.log((1 + len(documents)) / (1 + doc_freq)) + 1
+        matrix *= idf
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return matrix / norms, vocabulary
+
+
+def spherical_kmeans(matrix, k, max_iter=50, seed=0):
+    """
+    Cosine k-means on L2-normalized rows with deterministic k-means++ seeding.
+    Returns (labels, centroids).
+    """
+    n = matrix.shape[0]
+    k = max(1, min(k, n))
+    rng = np.random.default_rng(seed)
+
+    centroids = [matrix[0]]
+    for _ in range(1, k):
+        similarity = np.max(matrix @ np.stack(centroids).T, axis=1)
+        distance = np.clip(1 - similarity, 0, None)
+        if distance.sum() == 0:
+            break
+        centroids.append(matrix[rng.choice(n, p=distance / distance.sum())])
+    centroids = np.stack(centroids)
+
+    labels = np.full(n, -1)
+    for _ in range(max_iter):
+        new_labels = np.argmax(matrix @ centroids.T, axis=1)
+        if np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        for c in range(len(centroids)):
+            members = matrix[labels == c]
+            if len(members):
+                centroid = members.sum(axis=0)
+                norm = np.linalg.norm(centroid)
+                centroids[c] = centroid / norm if norm else centroid
+    return labels, centroids
+
+
+def default_k(n, max_clusters=30):
+    return max(1, min(max_clusters, int(round(np.sqrt(n / 2)))))
+
+
+def cluster_pain_points(scored_pains, k=None, max_clusters=30, top_terms=5):
+    """
+    Groups scored pain points locally. Returns clusters sorted by size with
+    'contained_pain_ids' (indices into scored_pains), 'aggregate_pain_score'
+    (mean pain_score), 'top_terms' and a few 'sample_problems'.
+    """
+    if not scored_pains:
+        return []
+
+    matrix, vocabulary = tfidf_matrix([pain_text(p) for p in scored_pains])
+    labels, centroids = spherical_kmeans(matrix, k or default_k(len(scored_pains), max_clusters))
+    pain_scores = np.array([score_value(p.get('pain_score')) for p in scored_pains])
+
+    clusters = []
+    for c in np.unique(labels):
+        ids = np.flatnonzero(labels == c)
+        terms = [vocabulary[i] for i in np.argsort(-centroids[c])[:top_terms] if centroids[c][i] > 0]
+        # Samples closest to the centroid describe the cluster best
+        closest = ids[np.argsort(-(matrix[ids] @ centroids[c]))[:3]]
+        clusters.append({
+            'contained_pain_ids': ids.tolist(),
+            'aggregate_pain_score': round(float(pain_scores[ids].mean()), 2),
+            'top_terms': terms,
+            'sample_problems': [scored_pains[i].get('problem', '') for i in closest]
+        })
+
+    clusters.sort(key=lambda cl: (-len(cl['contained_pain_ids']), cl['contained_pain_ids'][0]))
+    return clusters
@@ -1,34 +1,206 @@
 import os
 import json
+from concurrent.futures import ThreadPoolExecutor
 try:
     from execucao.utils import setup_logger, load_env_file
+    from execucao.llm_governor import get_governor
+    from execucao.llm_client import get_client, get_async_client
+    from execucao.tokens import estimate_tokens
 except ImportError:
     import sys
     sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
     from execucao.utils import setup_logger, load_env_file
+    from execucao.llm_governor import get_governor
+    from execucao.llm_client import get_client, get_async_client
+    from execucao.tokens import estimate_tokens
 
-from openai import OpenAI
+from radar.llm_memo import get_default_memo
+from radar.snippet_index import BM25Index, get_default_snippet_index
 
 logger = setup_logger('CompetitorScan')
 load_env_file()
 
+MODEL = "gpt-3.5-turbo"
+
+# Competitor evidence per prompt; larger corpora are reduced to the best BM25 snippets
+MAX_COMPETITOR_TOKENS = 1500
+MAX_SNIPPETS = 12
+
+COMBINED_PROMPT = """
+        Analyze the competitor landscape described below against the pain cluster "{cluster_name}".
+
+        Part 1 - Identify GAPS where competitors are failing. Look for:
+        - Complaints about complexity
+        - Missing features
+        - High price
+        - Poor support
+        - Slow results
+
+        Part 2 - Compare my proposed solution against the same landscape and calculate a
+        'differentiation_score' (1-10) based on:
+        - Uniqueness of mechanism
+        - Speed to result
+        - Price advantage
+        Provide a short 'analysis' explaining the score.
+
+        My Solution: {my_solution}
+
+        Competitor Data:
+        {competitor_data_text}
+
+        Return a JSON object with keys:
+        - 'gap_map' (object with keys 'ignored_complaints', 'price_gaps', 'usability_gaps')
+        - 'differentiation_score'
+        - 'analysis'
+        """
+
 class CompetitorScan:
-    def __init__(self):
+    def __init__(self, use_memo=True, max_concurrency=4, snippet_index=None):
         logger.warning("DEPRECATED: CompetitorScan is legacy. Use CompetitorScanB.")
-        api_key = os.getenv("OPENAI_API_KEY")
-        self.client = OpenAI(api_key=api_key) if api_key else None
+        self.client = get_client()
+        self.governor = get_governor()
+        self.memo = get_default_memo() if use_memo else None
+        self.max_concurrency = max_concurrency
+        self.snippet_index = snippet_index or get_default_snippet_index()
 
-    def analyze_gaps(self, cluster_info, competitor_data_text):
+    def add_competitor_page(self, url, text):
         """
-        Identifies gaps in existing solutions based on user complaints.
+        Indexes a fetched competitor page so later analyses can retrieve it.
+        Unchanged pages are skipped. Returns the number of new snippets.
+        """
+        added = self.snippet_index.add_document(url, text)
+        if added:
+            self.snippet_index.save()
+            logger.info(f"Indexed {added} competitor snippets from {url}")
+        return added
+
+    def competitor_context(self, cluster_info, competitor_data_text=None):
+        """
+        Competitor evidence for one cluster's prompt. Without text, the best
+        snippets for the cluster come from the competitor index; text over
+        MAX_COMPETITOR_TOKENS is reduced to its best snippets the same way.
+        """
+        if competitor_data_text is not None and estimate_tokens(competitor_data_text) <= MAX_COMPETITOR_TOKENS:
+            return competitor_data_text
+
+        index = self.snippet_index
+        if competitor_data_text is not None:
+            index = BM25Index()
+            index.add_document('competitor_data', competitor_data_text)
+
+        query = f"{cluster_info.get('cluster_name', '')} {cluster_info.get('potential_solution_hypothesis', '')}"
+        snippets = index.top_snippets(query, k=MAX_SNIPPETS, max_tokens=MAX_COMPETITOR_TOKENS)
+        if not snippets:
+            logger.warning(f"No competitor snippets match '{cluster_info.get('cluster_name')}'")
+        return '\n\n'.join(f"[{s['source']}] {s['text']}" for s in snippets)
+
+    def analyze_competition(self, cluster_info, competitor_data_text=None, my_solution_proposal=None):
+        """
+        Single-call replacement for analyze_gaps() + calculate_differentiation().
+        Returns {'gap_map', 'differentiation_score', 'analysis'}, memoized by
+        hash(cluster, solution, competitor evidence).
         """
+        my_solution = my_solution_proposal or cluster_info.get('potential_solution_hypothesis', '')
         if not self.client:
             return {
-                "ignored_complaints": ["Complex UI", "No PDF support"],
-                "price_gaps": ["Competitors charge >$50/mo"],
-                "usability_gaps": ["Requires coding knowledge"]
+                "gap_map": self._mock_gaps(),
+                "differentiation_score": 7,
+                "analysis": "MOCK: no API key configured."
             }
 
+        competitor_data_text = self.competitor_context(cluster_info, competitor_data_text)
+        memo_key = None
+        if self.memo:
+            memo_key = self.memo.key_for(MODEL, COMBINED_PROMPT, cluster_info.get('cluster_name'), my_solution, competitor_data_text)
+            cached = self.memo.get(memo_key)
+            if cached is not None:
+                logger.info(f"Memo hit for competitor analysis of '{cluster_info.get('cluster_name')}'")
+                return cached
+
+        prompt = COMBINED_PROMPT.format(
+            cluster_name=cluster_info.get('cluster_name'),
+            my_solution=my_solution,
+            competitor_data_text=competitor_data_text
+        )
+
+        try:
+            response = self.governor.chat(
+                self.client, priority='analysis',
+                model=MODEL,
+                messages=[{"role": "user", "content": prompt}],
+                response_format={ "type": "json_object" }
+            )
+            result = json.loads(response.choices[0].message.content)
+        except Exception as e:
+            logger.error(f"Error in competitor analysis: {e}")
+            raise  # Re-raise in production instead of falling back to MOCK
+
+        if memo_key:
+            self.memo.put(memo_key, result)
+        return result
+
+    def analyze_many(self, clusters, competitor_data=None):
+        """
+        Runs analyze_competition() for many clusters concurrently. `competitor_data`
+        is one corpus shared by all clusters, a list parallel to `clusters`, or
+        None to retrieve each cluster's evidence from the competitor index.
+        Returns results in cluster order; a failed cluster yields None.
+        """
+        if competitor_data is None or isinstance(competitor_data, str):
+            competitor_data = [competitor_data] * len(clusters)
+
+        def analyze(pair):
+            cluster_info, competitor_text = pair
+            try:
+                return self.analyze_competition(cluster_info, competitor_text)
+            except Exception as e:
+                logger.error(f"Error in competitor analysis: {e}")
+                return None
+
+        if not clusters:
+            return []
+        workers = min(self.max_concurrency, len(clusters))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(analyze, zip(clusters, competitor_data)))
+
+    def analyze_gaps(self, cluster_info, competitor_data_text=None):
+        """
+        Identifies gaps in existing solutions based on user complaints.
+        """
+        if not self.client:
+            return self._mock_gaps()
+
+        try:
+            response = self.governor.chat(self.client, priority='analysis', **self._gaps_request(cluster_info, competitor_data_text))
+            return json.loads(response.choices[0].message.content)
+        except Exception as e:
+            logger.error(f"Error in gap analysis: {e}")
+            raise  # Re-raise in production instead of falling back to MOCK
+
+    async def analyze_gaps_async(self, cluster_info, competitor_data_text=None):
+        """
+        Async variant of analyze_gaps() on the shared AsyncOpenAI client.
+        """
+        if not self.client:
+            return self._mock_gaps()
+
+        try:
+            response = await self.governor.achat(get_async_client(), priority='analysis', **self._gaps_request(cluster_info, competitor_data_text))
+            return json.loads(response.choices[0].message.content)
+        except Exception as e:
+            logger.error(f"Error in gap analysis: {e}")
+            raise  # Re-raise in production instead of falling back to MOCK
+
+    @staticmethod
+    def _mock_gaps():
+        return {
+            "ignored_complaints": ["Complex UI", "No PDF support"],
+            "price_gaps": ["Competitors charge >$50/mo"],
+            "usability_gaps": ["Requires coding knowledge"]
+        }
+
+    def _gaps_request(self, cluster_info, competitor_data_text):
+        competitor_data_text = self.competitor_context(cluster_info, competitor_data_text)
         prompt = f"""
         Analyze the competitor landscape described below against the pain cluster "{cluster_info.get('cluster_name')}".
          Identify GAPS where competitors are failing. Look for:
@@ -43,17 +215,11 @@ class CompetitorScan:
 
         Return a JSON object 'gap_map' with keys: 'ignored_complaints', 'price_gaps', 'usability_gaps'.
         """
-        
-        try:
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role": "user", "content": prompt}],
-                response_format={ "type": "json_object" }
-            )
-            return json.loads(response.choices[0].message.content)
-        except Exception as e:
-            logger.error(f"Error in gap analysis: {e}")
-            raise  # Re-raise in production instead of falling back to MOCK
+        return dict(
+            model="gpt-3.5-turbo",
+            messages=[{"role": "user", "content": prompt}],
+            response_format={ "type": "json_object" }
+        )
 
     def calculate_differentiation(self, my_solution_proposal, competitor_info):
         """
@@ -79,7 +245,8 @@ class CompetitorScan:
         """
         
         try:
-            response = self.client.chat.completions.create(
+            response = self.governor.chat(
+                self.client, priority='analysis',
                 model="gpt-3.5-turbo",
                 messages=[{"role": "user", "content": prompt}],
                 response_format={ "type": "json_object" }
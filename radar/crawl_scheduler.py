@@ -0,0 +1,346 @@
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+
+import requests
+try:
+    from execucao.utils import setup_logger
+except ImportError:
+    import sys
+    import os
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from execucao.utils import setup_logger
+
+logger = setup_logger('CrawlScheduler')
+
+# Statuses that mean "slow down" rather than "this page is broken"
+THROTTLE_STATUS = {429, 503}
+MAX_BACKOFF = 300
+
+
+class DisallowedByRobots(Exception):
+    pass
+
+
+def is_host_error(error):
+    """
+    True when a failed request says something about the host (throttling,
+    server errors, unreachable or slow), False for per-URL failures such as
+    404/410, which should not slow down the rest of the host's queue.
+    """
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return True
+    response = getattr(error, 'response', None)
+    if response is None:
+        return False
+    return response.status_code in THROTTLE_STATUS or response.status_code >= 500
+
+
+def host_of(url):
+    parts = urlsplit(url)
+    return f"{parts.scheme.lower()}://{parts.netloc.lower()}"
+
+
+class RobotsCache:
+    """
+    robots.txt rules per host, fetched once and kept for `ttl` seconds.
+    A missing robots.txt (4xx) allows everything; 401/403 disallow everything;
+    network errors and 5xx allow crawling but are retried after `retry_after`.
+    """
+    def __init__(self, session, user_agent, ttl=86400, retry_after=600, timeout=10):
+        self.session = session
+        self.user_agent = user_agent
+        self.ttl = ttl
+        self.retry_after = retry_after
+        self.timeout = timeout
+        self._rules = {}  # host -> (parser, expires_at)
+        self._host_locks = {}
+        self._lock = threading.Lock()
+
+    def _host_lock(self, host):
+        with self._lock:
+            return self._host_locks.setdefault(host, threading.Lock())
+
+    def rules(self, url):
+        host = host_of(url)
+        with self._host_lock(host):
+            cached = self._rules.get(host)
+            if cached and cached[1] > time.time():
+                return cached[0]
+            parser, ttl = self._download(host)
+            self._rules[host] = (parser, time.time() + ttl)
+            return parser
+
+    def _download(self, host):
+        parser = RobotFileParser(host + '/robots.txt')
+        try:
+            response = self.session.get(host + '/robots.txt', timeout=self.timeout)
+        except requests.RequestException as e:
+            logger.warning(f"robots.txt unavailable for {host}: {e}")
+            parser.allow_all = True
+            return parser, self.retry_after
+
+        if response.status_code in (401, 403):
+            parser.disallow_all = True
+        elif 400 <= response.status_code < 500:
+            parser.allow_all = True
+        elif response.status_code >= 500:
+            parser.allow_all = True
+            return parser, self.retry_after
+        else:
+            parser.parse(response.text.splitlines())
+        parser.modified()  # crawl_delay() and can_fetch() ignore rules without a fetch time
+        return parser, self.ttl
+
+    def can_fetch(self, url):
+        return self.rules(url).can_fetch(self.user_agent, url)
+
+    def crawl_delay(self, url):
+        rules = self.rules(url)
+        delay = rules.crawl_delay(self.user_agent)
+        if delay is None:
+            rate = rules.request_rate(self.user_agent)
+            if rate and rate.requests:
+                delay = rate.seconds / rate.requests
+        return float(delay) if delay is not None else None
+
+
+class HostState:
+    def __init__(self, host, delay):
+        self.host = host
+        self.delay = delay
+        self.pending = deque()
+        self.in_flight = 0
+        self.next_allowed = 0.0
+        self.requests = 0
+        self.errors = 0
+        self.failures = 0
+        self.consecutive_errors = 0
+        self.latencies = deque(maxlen=100)
+        self.robots_checked = False
+
+    def wait_time(self, now, limit):
+        """
+        Seconds until this host can take another request (0 = now, None = only after one finishes).
+        """
+        if self.in_flight >= limit:
+            return None
+        return max(0.0, self.next_allowed - now)
+
+    def snapshot(self):
+        latencies = sorted(self.latencies)
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'error_rate': round(self.errors / self.requests, 3) if self.requests else 0.0,
+            'url_failures': self.failures,
+            'avg_latency': round(sum(latencies) / len(latencies), 3) if latencies else None,
+            'p95_latency': round(latencies[int(0.95 * (len(latencies) - 1))], 3) if latencies else None,
+            'delay': round(self.delay, 3),
+            'queued': len(self.pending),
+            'in_flight': self.in_flight
+        }
+
+
+class PoliteScheduler:
+    """
+    Per-host crawl scheduling. Each host gets its own queue, at most
+    `per_host_limit` requests in flight and at least its crawl delay
+    (robots.txt Crawl-delay, else `default_delay`) between request starts.
+    Throttling, 5xx and connection errors back a host off exponentially; a
+    host with `max_host_errors` consecutive such errors is skipped for the
+    batch. Other 4xx responses only fail their URL.
+    run() interleaves hosts round-robin so workers stay busy on other hosts
+    while one is waiting out its delay.
+    """
+    def __init__(self, session, user_agent, per_host_limit=2, default_delay=1.0, max_workers=8,
+                 respect_robots=True, max_host_errors=5, robots_cache=None):
+        self.per_host_limit = per_host_limit
+        self.default_delay = default_delay
+        self.max_workers = max_workers
+        self.max_host_errors = max_host_errors
+        self.robots = (robots_cache or RobotsCache(session, user_agent)) if respect_robots else None
+        self.hosts = {}
+        self._cond = threading.Condition()
+
+    def _state(self, url):
+        host = host_of(url)
+        with self._cond:
+            if host not in self.hosts:
+                self.hosts[host] = HostState(host, self.default_delay)
+            return self.hosts[host]
+
+    def check_allowed(self, url, state=None):
+        """
+        Raises DisallowedByRobots when robots.txt forbids the URL. The first
+        check on a host also applies its Crawl-delay.
+        """
+        if not self.robots:
+            return
+        state = state or self._state(url)
+        if not state.robots_checked:
+            crawl_delay = self.robots.crawl_delay(url)
+            with self._cond:
+                if crawl_delay is not None and crawl_delay > state.delay:
+                    # Push back the slot already reserved under the default delay
+                    state.next_allowed += crawl_delay - state.delay
+                    state.delay = crawl_delay
+                state.robots_checked = True
+                self._cond.notify_all()
+        if not self.robots.can_fetch(url):
+            raise DisallowedByRobots(f"robots.txt disallows {url}")
+
+    def _limit(self, state):
+        # One request at a time until robots.txt has set the host's crawl delay
+        return self.per_host_limit if state.robots_checked or not self.robots else 1
+
+    def _reserve(self, state, block=True):
+        """
+        Takes a request slot on the host once its limit and delay allow.
+        Caller must hold the condition. Returns False if not blocking and not ready.
+        """
+        while True:
+            now = time.monotonic()
+            wait_for = state.wait_time(now, self._limit(state))
+            if wait_for == 0:
+                state.in_flight += 1
+                state.next_allowed = now + state.delay
+                return True
+            if not block:
+                return False
+            self._cond.wait(timeout=wait_for)
+
+    def _release(self, state, latency, error=None):
+        with self._cond:
+            state.in_flight -= 1
+            if latency is None:
+                # Slot given back without a request (e.g. disallowed by robots.txt)
+                self._cond.notify_all()
+                return
+            state.requests += 1
+            state.latencies.append(latency)
+            if error is not None and not is_host_error(error):
+                # The host answered; only this URL is broken
+                state.failures += 1
+                error = None
+            if error is None:
+                state.consecutive_errors = 0
+            else:
+                state.errors += 1
+                state.consecutive_errors += 1
+                backoff = min(MAX_BACKOFF, state.delay * 2 ** state.consecutive_errors)
+                response = getattr(error, 'response', None)
+                if response is not None and response.status_code in THROTTLE_STATUS:
+                    retry_after = response.headers.get('Retry-After', '')
+                    backoff = min(MAX_BACKOFF, float(retry_after)) if retry_after.isdigit() else max(backoff, 30)
+                    logger.warning(f"{state.host} is throttling us ({response.status_code}); backing off {backoff:.0f}s")
+                state.next_allowed = max(state.next_allowed, time.monotonic() + backoff)
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, url):
+        """
+        Blocks until `url` may be requested politely, then records the
+        request's latency and outcome for its host. Only errors that
+        is_host_error() attributes to the host count against it.
+        Raises DisallowedByRobots when robots.txt forbids the URL.
+        """
+        state = self._state(url)
+        self.check_allowed(url, state)
+        with self._cond:
+            self._reserve(state)
+        started = time.monotonic()
+        try:
+            yield
+        except requests.RequestException as e:
+            self._release(state, time.monotonic() - started, e)
+            raise
+        except Exception:
+            self._release(state, time.monotonic() - started)
+            raise
+        self._release(state, time.monotonic() - started)
+
+    def run(self, urls, fetch, max_workers=None):
+        """
+        Fetches `urls` with `fetch(url)` (which should raise on failure),
+        round-robin across hosts. Yields (url, result) as requests finish;
+        result is None for failed, disallowed or skipped URLs.
+        """
+        order = deque()
+        for url in dict.fromkeys(urls):
+            state = self._state(url)
+            if not state.pending:
+                order.append(state)
+                # Hosts are only skipped for the batch; their backoff still applies
+                with self._cond:
+                    state.consecutive_errors = 0
+            state.pending.append(url)
+
+        def task(state, url):
+            started = time.monotonic()
+            try:
+                self.check_allowed(url, state)
+                result = fetch(url)
+            except DisallowedByRobots as e:
+                logger.info(str(e))
+                self._release(state, None)
+                return None
+            except requests.RequestException as e:
+                logger.error(f"Error fetching {url}: {e}")
+                self._release(state, time.monotonic() - started, e)
+                return None
+            except Exception as e:
+                # Not the host's fault (e.g. rejected content type); no backoff
+                logger.info(f"Skipped {url}: {e}")
+                self._release(state, time.monotonic() - started)
+                return None
+            self._release(state, time.monotonic() - started)
+            return result
+
+        max_workers = max_workers or self.max_workers
+        running = {}
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            while order or running:
+                skipped = []
+                next_ready = None
+                with self._cond:
+                    for _ in range(len(order)):
+                        if len(running) >= max_workers:
+                            break
+                        state = order.popleft()
+                        if state.consecutive_errors >= self.max_host_errors:
+                            logger.error(f"Skipping {len(state.pending)} URLs on {state.host} after repeated errors")
+                            skipped.extend(state.pending)
+                            state.pending.clear()
+                            continue
+                        if self._reserve(state, block=False):
+                            url = state.pending.popleft()
+                            running[executor.submit(task, state, url)] = url
+                        else:
+                            wait_for = state.wait_time(time.monotonic(), self._limit(state))
+                            if wait_for is not None:
+                                next_ready = wait_for if next_ready is None else min(next_ready, wait_for)
+                        if state.pending:
+                            order.append(state)
+
+                for url in skipped:
+                    yield url, None
+                if not running:
+                    if order:
+                        time.sleep(next_ready if next_ready is not None else 0.05)
+                    continue
+
+                done, _ = wait(running, timeout=next_ready, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield running.pop(future), future.result()
+
+    def stats(self):
+        """
+        Per-host request counts, error rates, latency and queue depth.
+        """
+        with self._cond:
+            return {host: state.snapshot() for host, state in self.hosts.items()}
@@ -0,0 +1,264 @@
+import os
+import re
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import threading
+
+import numpy as np
+try:
+    from execucao.utils import setup_logger
+except ImportError:
+    import sys
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from execucao.utils import setup_logger
+
+logger = setup_logger('DedupIndex')
+
+DEFAULT_INDEX_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'temp', 'pain_dedup_index.sqlite')
+
+# Problem text kept per entry for inspection; matching only needs the signature
+MAX_STORED_CHARS = 300
+
+_PRIME = (1 << 31) - 1
+_WORD = re.compile(r"[a-z0-9]+")
+
+def shingles(text, size=3):
+    """
+    Word n-grams of the normalized text (single words for very short text).
+    """
+    words = _WORD.findall(text.lower())
+    if len(words) < size:
+        return set(words)
+    return {' '.join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def mention_key(pain):
+    """
+    One mention = one problem text seen on one source, so re-scanning the
+    same page does not count the problem again.
+    """
+    problem = ' '.join(_WORD.findall(str(pain.get('problem', '')).lower()))
+    source = pain.get('source_url') or pain.get('source') or ''
+    return hashlib.sha1(f"{source}\n{problem}".encode('utf-8')).digest()
+
+
+class MinHashLSH:
+    """
+    Persistent MinHash/LSH index over pain-point problem texts.
+    Signatures have `bands * rows` hash values; two texts become candidates
+    when any band matches and count as near-duplicates when their estimated
+    Jaccard similarity reaches `threshold`.
+    Entries, signatures and band buckets live in SQLite and are written
+    incrementally, along with the scores given to each entry so repeats
+    need not be scored again. Each entry counts distinct (source, problem) mentions;
+    entries not seen for `max_age_days` are pruned, and the least recently
+    seen ones go first once there are more than `max_entries`.
+    """
+    def __init__(self, path=None, bands=16, rows=4, threshold=0.6, seed=1,
+                 max_entries=50000, max_age_days=180):
+        self.path = path or DEFAULT_INDEX_PATH
+        self.bands = bands
+        self.rows = rows
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        num_perm = bands * rows
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _PRIME, size=num_perm, dtype=np.uint64)
+        self._lock = threading.RLock()
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS entries (
+                id INTEGER PRIMARY KEY,
+                problem TEXT NOT NULL,
+                signature BLOB NOT NULL,
+                count INTEGER NOT NULL DEFAULT 0,
+                last_seen REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_entries_last_seen ON entries(last_seen);
+            CREATE TABLE IF NOT EXISTS buckets (
+                key BLOB NOT NULL,
+                entry_id INTEGER NOT NULL REFERENCES entries(id) ON DELETE CASCADE
+            );
+            CREATE INDEX IF NOT EXISTS idx_buckets_key ON buckets(key);
+            CREATE INDEX IF NOT EXISTS idx_buckets_entry ON buckets(entry_id);
+            CREATE TABLE IF NOT EXISTS mentions (
+                entry_id INTEGER NOT NULL REFERENCES entries(id) ON DELETE CASCADE,
+                key BLOB NOT NULL,
+                PRIMARY KEY (entry_id, key)
+            );
+            CREATE TABLE IF NOT EXISTS scores (
+                entry_id INTEGER PRIMARY KEY REFERENCES entries(id) ON DELETE CASCADE,
+                data TEXT NOT NULL,
+                scored_at REAL NOT NULL
+            );
+        """)
+        params = f"{bands}x{rows}:{seed}"
+        stored = self.conn.execute("SELECT value FROM meta WHERE key = 'params'").fetchone()
+        if stored and stored[0] != params:
+            logger.warning("Dedup index was built with different LSH parameters. Starting a new index.")
+            self.conn.executescript("DELETE FROM scores; DELETE FROM mentions; DELETE FROM buckets; DELETE FROM entries;")
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('params', ?)", (params,))
+        self.conn.commit()
+        self.prune()
+
+    def signature(self, text):
+        hashes = np.array([zlib.crc32(s.encode('utf-8')) & _PRIME for s in shingles(text)] or [0], dtype=np.uint64)
+        # (a*x + b) mod p for every permutation and shingle at once, then min per permutation
+        return ((np.outer(self._a, hashes) + self._b[:, None]) % _PRIME).min(axis=1)
+
+    def _band_keys(self, signature):
+        for band in range(self.bands):
+            yield bytes([band]) + signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def find(self, text, signature=None):
+        """
+        Returns the id of the most similar stored entry above the threshold, or None.
+        """
+        signature = self.signature(text) if signature is None else signature
+        keys = list(self._band_keys(signature))
+        with self._lock:
+            rows = self.conn.execute(f"""
+                SELECT id, signature FROM entries WHERE id IN (
+                    SELECT entry_id FROM buckets WHERE key IN ({','.join('?' * len(keys))})
+                )
+            """, keys).fetchall()
+        best_id, best_score = None, self.threshold
+        for entry_id, blob in rows:
+            score = float(np.mean(np.frombuffer(blob, dtype=np.uint64) == signature))
+            if score >= best_score:
+                best_id, best_score = entry_id, score
+        return best_id
+
+    def add(self, text, mention=None, now=None):
+        """
+        Records a mention of `text` (default: the text itself, sourceless).
+        Returns (entry_id, was_seen_before). A mention already recorded for
+        the matching entry leaves its count unchanged. Not committed; call save().
+        """
+        signature = self.signature(text)
+        mention = mention or mention_key({'problem': text})
+        now = now or time.time()
+        with self._lock:
+            entry_id = self.find(text, signature)
+            seen_before = entry_id is not None
+            if entry_id is None:
+                entry_id = self.conn.execute(
+                    "INSERT INTO entries (problem, signature, count, last_seen) VALUES (?, ?, 0, ?)",
+                    (text[:MAX_STORED_CHARS], signature.tobytes(), now)).lastrowid
+                self.conn.executemany("INSERT INTO buckets (key, entry_id) VALUES (?, ?)",
+                                      [(key, entry_id) for key in self._band_keys(signature)])
+            added = self.conn.execute("INSERT OR IGNORE INTO mentions (entry_id, key) VALUES (?, ?)",
+                                      (entry_id, mention)).rowcount
+            self.conn.execute("UPDATE entries SET count = count + ?, last_seen = ? WHERE id = ?",
+                              (added, now, entry_id))
+            return entry_id, seen_before
+
+    def count(self, entry_id):
+        with self._lock:
+            row = self.conn.execute("SELECT count FROM entries WHERE id = ?", (entry_id,)).fetchone()
+        return row[0] if row else 0
+
+    def scores_for(self, entry_ids):
+        """
+        Stored scores as {entry_id: scores} for the entries that have them.
+        """
+        entry_ids = list(entry_ids)
+        found = {}
+        with self._lock:
+            for start in range(0, len(entry_ids), 500):
+                part = entry_ids[start:start + 500]
+                query = f"SELECT entry_id, data FROM scores WHERE entry_id IN ({','.join('?' * len(part))})"
+                found.update((entry_id, json.loads(data)) for entry_id, data in self.conn.execute(query, part))
+        return found
+
+    def store_scores(self, scores, now=None):
+        """
+        Saves {entry_id: scores} and commits.
+        """
+        now = now or time.time()
+        with self._lock:
+            self.conn.executemany("INSERT OR REPLACE INTO scores (entry_id, data, scored_at) VALUES (?, ?, ?)",
+                                  [(entry_id, json.dumps(data), now) for entry_id, data in scores.items()])
+            self.conn.commit()
+
+    def merge_duplicates(self, pain_points):
+        """
+        Collapses near-duplicate pain points (within the list and against
+        previous runs) into one record each, in first-seen order. Every record
+        gets 'mention_count' (distinct source/problem mentions across all runs
+        so far), 'seen_before' (True when an earlier run already recorded it)
+        and 'dedup_id' (its entry, for scores_for/store_scores).
+        """
+        merged = {}
+        created = set()
+        with self._lock:
+            for pain in pain_points:
+                text = str(pain.get('problem', ''))
+                if not text.strip():
+                    continue
+                entry_id, seen_before = self.add(text, mention_key(pain))
+                if not seen_before:
+                    created.add(entry_id)
+                if entry_id not in merged:
+                    merged[entry_id] = {**pain, 'seen_before': entry_id not in created, 'dedup_id': entry_id}
+            for entry_id, pain in merged.items():
+                pain['mention_count'] = self.count(entry_id)
+            self.save()
+
+        logger.info(f"Merged {len(pain_points)} pain points into {len(merged)} unique problems")
+        return list(merged.values())
+
+    def prune(self):
+        """
+        Deletes entries older than max_age_days, then the least recently seen
+        ones beyond max_entries. Returns the number of entries removed.
+        """
+        with self._lock:
+            deleted = self.conn.execute("DELETE FROM entries WHERE last_seen < ?",
+                                        (time.time() - self.max_age_days * 86400,)).rowcount
+            excess = self.conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0] - self.max_entries
+            if excess > 0:
+                deleted += self.conn.execute("""
+                    DELETE FROM entries WHERE id IN (SELECT id FROM entries ORDER BY last_seen, id LIMIT ?)
+                """, (excess,)).rowcount
+            self.conn.commit()
+        if deleted:
+            logger.info(f"Pruned {deleted} dedup entries")
+        return deleted
+
+    def save(self):
+        """
+        Commits pending changes, pruning first when the index is over its cap.
+        """
+        with self._lock:
+            total = self.conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            if total > self.max_entries:
+                self.prune()
+            self.conn.commit()
+
+
+_default_index = None
+_default_index_lock = threading.Lock()
+
+def get_default_index():
+    """
+    Process-wide dedup index so every PainAnalyzer shares one persisted state.
+    """
+    global _default_index
+    with _default_index_lock:
+        if _default_index is None:
+            _default_index = MinHashLSH()
+        return _default_index
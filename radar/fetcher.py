@@ -1,5 +1,7 @@
+import codecs
+
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
 try:
     from execucao.utils import setup_logger
 except ImportError:
@@ -8,31 +10,165 @@ except ImportError:
     sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
     from execucao.utils import setup_logger
 
+from radar.http_cache import get_default_cache, check_content_type, read_body, UnsupportedContent
+from radar.html_text import extract_text, TextStream
+from radar.crawl_scheduler import PoliteScheduler, host_of
+
 logger = setup_logger('FetchAgent')
 
+# Pages larger than this are cut off; forum threads and articles fit comfortably
+MAX_DOWNLOAD_BYTES = 2 * 1024 * 1024
+
+HTML_CONTENT_TYPES = frozenset(['text/html', 'application/xhtml+xml', 'text/plain'])
+
+MOCK_HTML = "<html><body><h1>Mock Content</h1><p>I hate doing manual excel reports. It takes 5 hours a week. I wish there was a tool.</p></body></html>"
+
 class FetchAgent:
-    def __init__(self):
+    def __init__(self, max_workers=8, per_host_limit=2, timeout=15, use_cache=True,
+                 text_backend=None, max_text_chars=None, crawl_delay=1.0, respect_robots=True,
+                 max_bytes=MAX_DOWNLOAD_BYTES, content_types=HTML_CONTENT_TYPES):
         self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
         }
+        self.max_workers = max_workers
+        self.per_host_limit = per_host_limit
+        self.timeout = timeout
+        self.text_backend = text_backend
+        self.max_text_chars = max_text_chars
+        self.max_bytes = max_bytes
+        self.content_types = content_types
+
+        # One pooled session so repeated hosts reuse keep-alive connections
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
 
-    def fetch(self, url):
+        self.cache = get_default_cache() if use_cache else None
+
+        # Per-host queues, robots.txt, crawl delay and per-host stats
+        self.scheduler = PoliteScheduler(self.session, self.headers["User-Agent"], per_host_limit=per_host_limit,
+                                         default_delay=crawl_delay, max_workers=max_workers,
+                                         respect_robots=respect_robots)
+
+    def _is_cached(self, url):
+        if not self.cache:
+            return False
+        _, entry = self.cache.lookup(url)
+        return self.cache.is_fresh(entry)
+
+    def _download(self, url, timeout=None, on_chunk=None):
         """
-        Fetches the URL and checks if it allows scraping.
+        Single streamed GET through the cache. Non-HTML content types are
+        rejected from the headers and at most max_bytes are read; `on_chunk`
+        sees each chunk as it arrives. Raises on network and HTTP errors.
         """
         if "example.com" in url:
             logger.info("Returning MOCK content for example.com")
-            return "<html><body><h1>Mock Content</h1><p>I hate doing manual excel reports. It takes 5 hours a week. I wish there was a tool.</p></body></html>"
+            if on_chunk:
+                on_chunk(MOCK_HTML.encode('utf-8'), 'utf-8')
+            return MOCK_HTML
 
         logger.info(f"Fetching URL: {url}")
+        if self.cache:
+            response = self.cache.get(self.session, url, timeout=timeout or self.timeout, max_bytes=self.max_bytes,
+                                      content_types=self.content_types, on_chunk=on_chunk)
+            return response.text
+
+        response = self.session.get(url, timeout=timeout or self.timeout, stream=True)
         try:
-            response = requests.get(url, headers=self.headers, timeout=15)
             response.raise_for_status()
-            return response.text
+            check_content_type(url, response.headers.get('Content-Type'), self.content_types)
+            content, _ = read_body(response, self.max_bytes, on_chunk)
+        finally:
+            response.close()
+        return content.decode(response.encoding or 'utf-8', errors='replace')
+
+    def _download_text(self, url, timeout=None):
+        """
+        Downloads and extracts in one pass: chunks are decoded incrementally
+        and fed to the text extractor, and the download stops as soon as
+        max_text_chars of text have been collected.
+        """
+        stream = TextStream(self.text_backend, self.max_text_chars)
+        decoder = None
+
+        def on_chunk(chunk, encoding):
+            nonlocal decoder
+            if decoder is None:
+                try:
+                    decoder = codecs.getincrementaldecoder(encoding or 'utf-8')(errors='replace')
+                except LookupError:
+                    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+            return stream.feed(decoder.decode(chunk))
+
+        self._download(url, timeout, on_chunk)
+        if decoder is not None:
+            stream.feed(decoder.decode(b'', final=True))
+        return stream.close()
+
+    def _polite(self, url, download, timeout=None):
+        """
+        Runs `download(url, timeout)` in the host's politeness slot unless the
+        page is freshly cached. Returns None on failure.
+        """
+        try:
+            if "example.com" in url or self._is_cached(url):
+                return download(url, timeout)
+            with self.scheduler.slot(url):
+                return download(url, timeout)
+        except UnsupportedContent as e:
+            logger.info(str(e))
+            return None
         except Exception as e:
             logger.error(f"Error fetching {url}: {e}")
             return None
 
+    def fetch(self, url, timeout=None):
+        """
+        Fetches the URL and checks if it allows scraping.
+        Waits for the host's politeness slot unless the page is freshly cached.
+        """
+        return self._polite(url, self._download, timeout)
+
+    def fetch_text(self, url, timeout=None):
+        """
+        Fetches the URL and returns its cleaned text, extracted while downloading.
+        """
+        return self._polite(url, self._download_text, timeout) or ""
+
+    def _many(self, urls, download, max_workers=None, timeout=None):
+        urls = list(dict.fromkeys(urls))  # Drop duplicates, keep order
+        if not urls:
+            return
+
+        remote = []
+        for url in urls:
+            if "example.com" in url or self._is_cached(url):
+                yield url, self._polite(url, download, timeout)
+            else:
+                remote.append(url)
+        if not remote:
+            return
+
+        logger.info(f"Fetching {len(remote)} URLs across {len({host_of(u) for u in remote})} hosts")
+        yield from self.scheduler.run(remote, lambda url: download(url, timeout), max_workers=max_workers)
+
+    def fetch_many(self, urls, max_workers=None, timeout=None):
+        """
+        Fetches many URLs over the shared session, round-robin across hosts
+        within each host's politeness limits. Freshly cached pages are served first.
+        Yields (url, html) tuples as each download finishes; html is None on failure.
+        """
+        yield from self._many(urls, self._download, max_workers, timeout)
+
+    def crawl_stats(self):
+        """
+        Per-host request counts, error rates and latency from the scheduler.
+        """
+        return self.scheduler.stats()
+
     def clean(self, html_content):
         """
         Removes navigation, headers, footers, scripts, styles to leave mostly content.
@@ -40,22 +176,14 @@ class FetchAgent:
         if not html_content:
             return ""
 
-        soup = BeautifulSoup(html_content, 'html.parser')
-
-        # Remove unwanted tags
-        for tag in soup(['script', 'style', 'nav', 'header', 'footer', 'aside', 'iframe', 'noscript']):
-            tag.decompose()
-
-        # Get text
-        text = soup.get_text(separator='\n')
-        
-        # Clean up whitespace
-        lines = (line.strip() for line in text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        text = '\n'.join(chunk for chunk in chunks if chunk)
-        
-        return text
+        return extract_text(html_content, backend=self.text_backend, max_chars=self.max_text_chars)
 
     def run(self, url):
-        html = self.fetch(url)
-        return self.clean(html)
+        return self.fetch_text(url)
+
+    def run_many(self, urls, max_workers=None):
+        """
+        Concurrent counterpart of run(): yields (url, cleaned_text) as pages arrive.
+        """
+        for url, text in self._many(urls, self._download_text, max_workers):
+            yield url, text or ""
@@ -0,0 +1,243 @@
+import os
+import re
+import math
+import time
+import sqlite3
+import hashlib
+import threading
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+try:
+    from execucao.utils import setup_logger
+except ImportError:
+    import sys
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from execucao.utils import setup_logger
+
+from radar.http_cache import canonical_url
+
+logger = setup_logger('CrawlFrontier')
+
+DEFAULT_FRONTIER_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'temp', 'crawl_frontier.sqlite')
+
+# (host suffix, path prefix) -> query parameter holding the real target
+REDIRECTORS = {
+    ('duckduckgo.com', '/l/'): 'uddg',
+    ('google.com', '/url'): 'q',
+    ('facebook.com', '/l.php'): 'u',
+    ('out.reddit.com', '/'): 'url',
+    ('youtube.com', '/redirect'): 'q'
+}
+
+TRACKING_PARAMS = frozenset([
+    'fbclid', 'gclid', 'dclid', 'msclkid', 'mc_cid', 'mc_eid', 'igshid', 'yclid',
+    'ref', 'ref_src', 'ref_url', 'referrer', 'source', 'share', 'si', 'spm', '_ga', '_hsenc', '_hsmi'
+])
+TRACKING_PREFIXES = ('utm_', 'pk_', 'hsa_', 'vero_')
+
+MOBILE_PREFIXES = ('m.', 'mobile.', 'amp.')
+
+DAY = 86400
+
+
+def unwrap_redirect(url, max_hops=3):
+    """
+    Follows known redirector wrappers (e.g. DuckDuckGo's //duckduckgo.com/l/?uddg=...)
+    to the target URL without a network request.
+    """
+    for _ in range(max_hops):
+        if url.startswith('//'):
+            url = 'https:' + url
+        parts = urlsplit(url)
+        host = (parts.hostname or '').lower()
+        target = None
+        for (suffix, prefix), param in REDIRECTORS.items():
+            if (host == suffix or host.endswith('.' + suffix)) and parts.path.startswith(prefix):
+                target = dict(parse_qsl(parts.query)).get(param)
+                break
+        if not target:
+            return url
+        url = target
+    return url
+
+
+def normalize_url(url):
+    """
+    Dedup form of a URL: redirects unwrapped, mobile host prefixes, tracking
+    parameters and trailing slashes removed, then http_cache.canonical_url()
+    (case, default port, fragment, query order). Only for comparing pages;
+    fetch the original URL, since the stripped parts can matter to the site.
+    """
+    parts = urlsplit(unwrap_redirect(url.strip()))
+    host = parts.netloc.lower()
+    for prefix in MOBILE_PREFIXES:
+        if host.startswith(prefix) and host.count('.') >= 2:
+            host = host[len(prefix):]
+            break
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+             if k.lower() not in TRACKING_PARAMS and not k.lower().startswith(TRACKING_PREFIXES)]
+    path = re.sub(r'/{2,}', '/', parts.path)
+    if len(path) > 1:
+        path = path.rstrip('/')
+    return canonical_url(urlunsplit((parts.scheme or 'https', host.rstrip('.'), path, urlencode(query), '')))
+
+
+def url_key(url):
+    """
+    Dedup key: the normalized URL without scheme or 'www.', so http/https and
+    www/bare-host copies of a page count as one.
+    """
+    parts = urlsplit(normalize_url(url))
+    host = parts.netloc[4:] if parts.netloc.startswith('www.') else parts.netloc
+    return urlunsplit(('', host, parts.path, parts.query, '')).lstrip('/')
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter sized for `capacity` items at `error_rate`.
+    Answers "definitely not seen" without touching the seen-set on disk.
+    """
+    def __init__(self, capacity=1_000_000, error_rate=0.01):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class CrawlFrontier:
+    """
+    Persistent seen-set of processed pages shared across queries and runs.
+    A page is due again once its last fetch is older than `freshness`
+    seconds. The Bloom filter is rebuilt from the seen-set on start and
+    answers most "never seen" checks in memory.
+    reserve() holds a page for this process only; it reaches the seen-set
+    through record() once it was processed, or is dropped with release(),
+    so failed or aborted pages are retried on the next run.
+    """
+    def __init__(self, path=None, freshness=7 * DAY, capacity=1_000_000, error_rate=0.01):
+        self.path = path or DEFAULT_FRONTIER_PATH
+        self.freshness = freshness
+        self.bloom = BloomFilter(capacity, error_rate)
+        self.skipped = 0
+        self._reserved = set()
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS seen (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            )
+        """)
+        self.conn.commit()
+        for (key,) in self.conn.execute("SELECT key FROM seen"):
+            self.bloom.add(key)
+
+    def _is_fresh(self, key, now):
+        if key not in self.bloom:
+            return False
+        row = self.conn.execute("SELECT fetched_at FROM seen WHERE key = ?", (key,)).fetchone()
+        return row is not None and now - row[0] < self.freshness
+
+    def is_due(self, url):
+        """
+        True when the page was never fetched or its last fetch is stale.
+        """
+        with self._lock:
+            return not self._is_fresh(url_key(url), time.time())
+
+    def reserve(self, url):
+        """
+        True when the caller should process the page: it is due and not
+        already reserved in this process (e.g. by another query in this run).
+        """
+        key = url_key(url)
+        with self._lock:
+            if key in self._reserved or self._is_fresh(key, time.time()):
+                self.skipped += 1
+                return False
+            self._reserved.add(key)
+            return True
+
+    def record(self, url):
+        """
+        Marks a page as processed now, starting its freshness window.
+        """
+        key = url_key(url)
+        with self._lock:
+            self.conn.execute("INSERT OR REPLACE INTO seen (key, url, fetched_at) VALUES (?, ?, ?)",
+                              (key, normalize_url(url), time.time()))
+            self.conn.commit()
+            self.bloom.add(key)
+            self._reserved.discard(key)
+
+    def release(self, url):
+        """
+        Gives up a reservation without recording the page.
+        """
+        with self._lock:
+            self._reserved.discard(url_key(url))
+
+    def claim(self, url):
+        """
+        Reserves and records a page in one step. Returns True when the caller
+        should fetch it, False when it was processed within the freshness
+        window or is reserved elsewhere in this run.
+        """
+        if not self.reserve(url):
+            return False
+        self.record(url)
+        return True
+
+    def claim_many(self, urls):
+        """
+        URLs from `urls` that are due, in order, each page at most once.
+        """
+        return [url for url in urls if self.claim(url)]
+
+    def forget(self, url):
+        """
+        Drops a page from the seen-set (e.g. after a failed fetch) so it can be retried.
+        """
+        key = url_key(url)
+        with self._lock:
+            self.conn.execute("DELETE FROM seen WHERE key = ?", (key,))
+            self.conn.commit()
+            self._reserved.discard(key)
+
+    def prune(self):
+        """
+        Deletes entries past the freshness window. The Bloom filter keeps their
+        bits until the next start; stale hits just fall through to the table.
+        """
+        with self._lock:
+            deleted = self.conn.execute("DELETE FROM seen WHERE fetched_at < ?", (time.time() - self.freshness,)).rowcount
+            self.conn.commit()
+        return deleted
+
+
+_default_frontier = None
+_default_frontier_lock = threading.Lock()
+
+def get_default_frontier():
+    """
+    Process-wide crawl frontier so every query in a run shares one seen-set.
+    """
+    global _default_frontier
+    with _default_frontier_lock:
+        if _default_frontier is None:
+            _default_frontier = CrawlFrontier()
+        return _default_frontier
@@ -0,0 +1,200 @@
+import re
+from html.parser import HTMLParser
+try:
+    from execucao.utils import setup_logger
+except ImportError:
+    import sys
+    import os
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from execucao.utils import setup_logger
+
+logger = setup_logger('HTMLText')
+
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
+
+# Content under these tags is dropped while parsing
+SKIP_TAGS = frozenset(['script', 'style', 'nav', 'header', 'footer', 'aside', 'iframe', 'noscript', 'ads'])
+
+FEED_CHUNK = 64 * 1024
+
+_HTML_HINT = re.compile(r'<\s*(html|body|div|p|span|a|script|head|br|li|table)\b', re.IGNORECASE)
+
+def looks_like_html(text):
+    """
+    Cheap check used to avoid re-parsing text that was already extracted.
+    """
+    return bool(text) and bool(_HTML_HINT.search(text[:FEED_CHUNK]))
+
+
+def _normalize(parts, max_chars=None):
+    """
+    Same whitespace cleanup FetchAgent.clean always applied: one phrase per line.
+    """
+    text = '\n'.join(parts)
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    text = '\n'.join(chunk for chunk in chunks if chunk)
+    return text[:max_chars] if max_chars else text
+
+
+class _TextCollector:
+    """
+    Parser target shared by the streaming backends. Collects one string per
+    text node, ignores anything nested in SKIP_TAGS and reports when the
+    size cap has been reached.
+    """
+    def __init__(self, max_chars=None):
+        self.max_chars = max_chars
+        self.parts = []
+        self.size = 0
+        self.skip_depth = 0
+        self._buffer = []
+
+    @property
+    def full(self):
+        return bool(self.max_chars) and self.size >= self.max_chars
+
+    def _flush(self):
+        if self._buffer:
+            text = ''.join(self._buffer)
+            self._buffer = []
+            self.parts.append(text)
+            self.size += len(text)
+
+    def start(self, tag, attrib=None):
+        self._flush()
+        if tag.lower() in SKIP_TAGS:
+            self.skip_depth += 1
+
+    def end(self, tag):
+        self._flush()
+        if tag.lower() in SKIP_TAGS and self.skip_depth:
+            self.skip_depth -= 1
+
+    def data(self, data):
+        if not self.skip_depth:
+            self._buffer.append(data)
+
+    def comment(self, text):
+        pass
+
+    def close(self):
+        self._flush()
+        return self.parts
+
+
+class _StdlibTokenizer(HTMLParser):
+    def __init__(self, collector):
+        super().__init__(convert_charrefs=True)
+        self.collector = collector
+
+    def handle_starttag(self, tag, attrs):
+        self.collector.start(tag)
+
+    def handle_endtag(self, tag):
+        self.collector.end(tag)
+
+    def handle_data(self, data):
+        self.collector.data(data)
+
+
+def _feed_chunks(parser, collector, html):
+    for offset in range(0, len(html), FEED_CHUNK):
+        parser.feed(html[offset:offset + FEED_CHUNK])
+        if collector.full:
+            return True
+    return False
+
+
+def extract_text_stdlib(html, max_chars=None):
+    """
+    Streaming extraction with the standard library tokenizer.
+    """
+    collector = _TextCollector(max_chars)
+    parser = _StdlibTokenizer(collector)
+    if not _feed_chunks(parser, collector, html):
+        parser.close()
+    return _normalize(collector.close(), max_chars)
+
+
+def extract_text_lxml(html, max_chars=None):
+    """
+    Streaming extraction with lxml's C parser feeding the collector directly,
+    so no tree is ever built.
+    """
+    collector = _TextCollector(max_chars)
+    parser = etree.HTMLParser(target=collector, remove_comments=True)
+    if not _feed_chunks(parser, collector, html):
+        parser.close()
+    return _normalize(collector.close(), max_chars)
+
+
+def extract_text_bs4(html, max_chars=None):
+    """
+    Original BeautifulSoup implementation, kept as the reference backend.
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser')
+    for tag in soup(list(SKIP_TAGS)):
+        tag.decompose()
+    return _normalize([soup.get_text(separator='\n')], max_chars)
+
+
+class TextStream:
+    """
+    Incremental extraction for HTML that arrives in pieces, e.g. a download
+    decoded chunk by chunk. feed() returns False once `max_chars` characters
+    have been collected so the caller can stop reading. bs4 cannot parse
+    incrementally, so it streams with the stdlib tokenizer instead.
+    """
+    def __init__(self, backend=None, max_chars=None):
+        backend = backend or default_backend()
+        if backend == 'lxml' and etree is None:
+            backend = 'stdlib'
+        self.max_chars = max_chars
+        self.collector = _TextCollector(max_chars)
+        if backend == 'lxml':
+            self.parser = etree.HTMLParser(target=self.collector, remove_comments=True)
+        else:
+            self.parser = _StdlibTokenizer(self.collector)
+        self.fed = False
+
+    def feed(self, text):
+        if text and not self.collector.full:
+            self.parser.feed(text)
+            self.fed = True
+        return not self.collector.full
+
+    def close(self):
+        if self.fed and not self.collector.full:
+            self.parser.close()
+        return _normalize(self.collector.close(), self.max_chars)
+
+
+BACKENDS = {
+    'lxml': extract_text_lxml,
+    'stdlib': extract_text_stdlib,
+    'bs4': extract_text_bs4
+}
+
+def default_backend():
+    return 'lxml' if etree is not None else 'stdlib'
+
+
+def extract_text(html, backend=None, max_chars=None):
+    """
+    Converts an HTML document to cleaned text, one phrase per line.
+    `backend` is one of BACKENDS (defaults to lxml when installed); parsing
+    stops early once `max_chars` characters of text have been collected.
+    """
+    if not html:
+        return ""
+    backend = backend or default_backend()
+    if backend == 'lxml' and etree is None:
+        logger.warning("lxml not installed. Falling back to the stdlib tokenizer.")
+        backend = 'stdlib'
+    return BACKENDS[backend](html, max_chars)
@@ -0,0 +1,279 @@
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+try:
+    from execucao.utils import setup_logger
+except ImportError:
+    import sys
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from execucao.utils import setup_logger
+
+logger = setup_logger('HTTPCache')
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'temp', 'http_cache')
+
+STREAM_CHUNK = 64 * 1024
+
+
+class UnsupportedContent(Exception):
+    """
+    Raised before the body is read when a response's Content-Type is not accepted.
+    """
+    pass
+
+
+def check_content_type(url, content_type, accepted=None):
+    """
+    Raises UnsupportedContent unless the MIME type is in `accepted` (None accepts
+    anything). Responses without a Content-Type are let through.
+    """
+    mime = (content_type or '').split(';')[0].strip().lower()
+    if accepted and mime and mime not in accepted:
+        raise UnsupportedContent(f"Skipping {url}: content type {mime}")
+
+
+def read_body(response, max_bytes=None, on_chunk=None):
+    """
+    Reads a streamed requests response in chunks, stopping at `max_bytes` or
+    when `on_chunk(chunk, encoding)` returns False.
+    Returns (content, complete); complete is False when the body was cut short.
+    """
+    if max_bytes is None and on_chunk is None:
+        return response.content, True
+    declared = response.headers.get('Content-Length', '')
+    if max_bytes and declared.isdigit() and int(declared) > max_bytes:
+        logger.info(f"{response.url} is {int(declared)} bytes; keeping the first {max_bytes}")
+
+    chunks, size = [], 0
+    for chunk in response.iter_content(STREAM_CHUNK):
+        if max_bytes and size + len(chunk) > max_bytes:
+            chunk = chunk[:max_bytes - size]
+        chunks.append(chunk)
+        size += len(chunk)
+        if on_chunk and on_chunk(chunk, response.encoding) is False:
+            return b''.join(chunks), False
+        if max_bytes and size >= max_bytes:
+            return b''.join(chunks), False
+    return b''.join(chunks), True
+
+def canonical_url(url):
+    """
+    Normalizes a URL for use as a cache key (case, default ports, fragment, query order).
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and not ((scheme == 'http' and parts.port == 80) or (scheme == 'https' and parts.port == 443)):
+        host = f"{host}:{parts.port}"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, parts.path or '/', query, ''))
+
+
+class CachedResponse:
+    """
+    Minimal response object returned by HTTPCache.get().
+    """
+    def __init__(self, url, status_code, content, headers, encoding=None, from_cache=False):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+        self.encoding = encoding
+        self.from_cache = from_cache
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding or 'utf-8', errors='replace')
+
+
+class HTTPCache:
+    """
+    Persistent on-disk response cache with ETag/Last-Modified revalidation.
+    Entries younger than `ttl` seconds are served without touching the network;
+    older ones are revalidated with a conditional GET. The least recently used
+    entries are evicted once the stored bodies exceed `max_bytes`.
+    """
+    def __init__(self, cache_dir=None, ttl=3600, max_bytes=200 * 1024 * 1024):
+        self.cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.index_file = os.path.join(self.cache_dir, 'index.json')
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.index = self._load_index()
+
+    def _load_index(self):
+        if not os.path.exists(self.index_file):
+            return {}
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"Discarding unreadable cache index: {e}")
+            return {}
+
+    def _save_index(self):
+        tmp_path = self.index_file + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.index, f)
+        os.replace(tmp_path, self.index_file)
+
+    def _body_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.body")
+
+    @staticmethod
+    def key_for(url):
+        return hashlib.sha256(canonical_url(url).encode('utf-8')).hexdigest()
+
+    def lookup(self, url):
+        """
+        Returns (key, entry) for the URL; entry is None when nothing usable is stored.
+        """
+        key = self.key_for(url)
+        with self._lock:
+            entry = self.index.get(key)
+        if entry and not os.path.exists(self._body_path(key)):
+            entry = None
+        return key, entry
+
+    def is_fresh(self, entry):
+        return entry is not None and time.time() - entry['fetched_at'] < self.ttl
+
+    def conditional_headers(self, entry):
+        headers = {}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def read(self, key, entry, refreshed=False):
+        """
+        Loads a stored body, marking it as recently used (and re-validated if `refreshed`).
+        Plain hits only touch the in-memory LRU time; the index file is rewritten
+        when an entry's validity changes.
+        """
+        with open(self._body_path(key), 'rb') as f:
+            content = f.read()
+        with self._lock:
+            entry['last_access'] = time.time()
+            self.index[key] = entry
+            if refreshed:
+                entry['fetched_at'] = entry['last_access']
+                self._save_index()
+        return CachedResponse(entry['url'], 200, content, {'Content-Type': entry.get('content_type', '')},
+                              encoding=entry.get('encoding'), from_cache=True)
+
+    def store(self, url, content, headers, encoding=None):
+        """
+        Persists a 200 response body and its validators.
+        """
+        if 'no-store' in headers.get('Cache-Control', ''):
+            return
+        key = self.key_for(url)
+        # Unique temp file per write so concurrent stores of one URL never share it
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix=key[:16], suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(content)
+            os.replace(tmp_path, self._body_path(key))
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        now = time.time()
+        with self._lock:
+            self.index[key] = {
+                'url': canonical_url(url),
+                'etag': headers.get('ETag'),
+                'last_modified': headers.get('Last-Modified'),
+                'content_type': headers.get('Content-Type', ''),
+                'encoding': encoding,
+                'size': len(content),
+                'fetched_at': now,
+                'last_access': now
+            }
+            self._evict()
+            self._save_index()
+
+    def _evict(self):
+        """
+        Drops least recently used entries until the total body size fits max_bytes.
+        Caller must hold the lock.
+        """
+        total = sum(e['size'] for e in self.index.values())
+        if total <= self.max_bytes:
+            return
+        for key, entry in sorted(self.index.items(), key=lambda kv: kv[1]['last_access']):
+            if total <= self.max_bytes:
+                break
+            total -= entry['size']
+            del self.index[key]
+            try:
+                os.remove(self._body_path(key))
+            except OSError:
+                pass
+            logger.info(f"Evicted cached response: {entry['url']}")
+
+    @staticmethod
+    def _replay(response, on_chunk):
+        if on_chunk:
+            for offset in range(0, len(response.content), STREAM_CHUNK):
+                if on_chunk(response.content[offset:offset + STREAM_CHUNK], response.encoding) is False:
+                    break
+        return response
+
+    def get(self, session, url, timeout=15, headers=None, max_bytes=None, content_types=None, on_chunk=None):
+        """
+        GETs the URL through the cache using the given requests session.
+        Raises for HTTP errors like requests would, and UnsupportedContent
+        (before reading the body) for types outside `content_types`.
+        The body is streamed: at most `max_bytes` are read, and `on_chunk`
+        sees each chunk as it arrives (returning False stops the download).
+        Only complete bodies are cached.
+        """
+        key, entry = self.lookup(url)
+        if self.is_fresh(entry):
+            check_content_type(url, entry.get('content_type'), content_types)
+            logger.info(f"Cache hit (fresh): {url}")
+            return self._replay(self.read(key, entry), on_chunk)
+
+        request_headers = dict(headers or {})
+        request_headers.update(self.conditional_headers(entry))
+        response = session.get(url, headers=request_headers, timeout=timeout, stream=True)
+        try:
+            if response.status_code == 304 and entry:
+                check_content_type(url, entry.get('content_type'), content_types)
+                logger.info(f"Cache hit (revalidated): {url}")
+                return self._replay(self.read(key, entry, refreshed=True), on_chunk)
+
+            response.raise_for_status()
+            check_content_type(url, response.headers.get('Content-Type'), content_types)
+            content, complete = read_body(response, max_bytes, on_chunk)
+        finally:
+            response.close()
+
+        if complete:
+            self.store(url, content, response.headers, encoding=response.encoding)
+        return CachedResponse(url, response.status_code, content, response.headers,
+                              encoding=response.encoding)
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+def get_default_cache():
+    """
+    Process-wide cache shared by FetchAgent and RSSReader.
+    """
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = HTTPCache()
+        return _default_cache
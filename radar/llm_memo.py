@@ -0,0 +1,120 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+try:
+    from execucao.utils import setup_logger
+except ImportError:
+    import sys
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from execucao.utils import setup_logger
+
+logger = setup_logger('LLMMemo')
+
+DEFAULT_MEMO_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'temp', 'llm_memo.sqlite')
+
+class LLMMemo:
+    """
+    Persistent memo of LLM results keyed by a content hash of everything that
+    determines the answer (model, prompt template, input text). Backed by
+    SQLite; least recently used rows are evicted once the stored values
+    exceed `max_bytes`.
+    """
+    def __init__(self, path=None, max_bytes=100 * 1024 * 1024):
+        self.path = path or DEFAULT_MEMO_PATH
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS memo (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_memo_last_access ON memo(last_access)")
+        self.conn.commit()
+
+    @staticmethod
+    def key_for(*parts):
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(str(part).encode('utf-8'))
+            digest.update(b'\x00')
+        return digest.hexdigest()
+
+    def get(self, key):
+        """
+        Returns the stored value or None on a miss.
+        """
+        with self._lock:
+            row = self.conn.execute("SELECT value FROM memo WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.conn.execute("UPDATE memo SET last_access = ? WHERE key = ?", (time.time(), key))
+            self.conn.commit()
+        return json.loads(row[0])
+
+    def put(self, key, value):
+        payload = json.dumps(value)
+        now = time.time()
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO memo (key, value, size, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, payload, len(payload), now, now)
+            )
+            self._evict()
+            self.conn.commit()
+
+    def _evict(self):
+        """
+        Deletes least recently used rows until the total size fits max_bytes.
+        Caller must hold the lock.
+        """
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM memo").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        for key, size in self.conn.execute("SELECT key, size FROM memo ORDER BY last_access").fetchall():
+            if total <= self.max_bytes:
+                break
+            self.conn.execute("DELETE FROM memo WHERE key = ?", (key,))
+            total -= size
+            evicted += 1
+        logger.info(f"Evicted {evicted} memo entries")
+
+    def stats(self):
+        with self._lock:
+            entries, size = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM memo").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': entries,
+            'bytes': size
+        }
+
+
+_default_memo = None
+_default_memo_lock = threading.Lock()
+
+def get_default_memo():
+    """
+    Process-wide memo store shared by the radar agents.
+    """
+    global _default_memo
+    with _default_memo_lock:
+        if _default_memo is None:
+            _default_memo = LLMMemo()
+        return _default_memo
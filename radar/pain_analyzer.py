@@ -1,29 +1,95 @@
 import os
 import json
+import math
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 try:
     from execucao.utils import setup_logger, load_env_file
+    from execucao.tokens import estimate_tokens
+    from execucao.llm_governor import get_governor
+    from execucao.llm_client import get_client, get_async_client
 except ImportError:
     import sys
     sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
     from execucao.utils import setup_logger, load_env_file
+    from execucao.tokens import estimate_tokens
+    from execucao.llm_governor import get_governor
+    from execucao.llm_client import get_client, get_async_client
 
-from openai import OpenAI
+from radar.clustering import cluster_pain_points
+from radar.dedup_index import get_default_index
 
 logger = setup_logger('PainAnalyzer')
 load_env_file()
 
+SCORE_KEYS = ['pain_score', 'urgency_score', 'frequency_score', 'role_value_score', 'willingness_to_pay_score']
+
+# Input budget per scoring request
+MAX_BATCH_TOKENS = 2000
+
+# Problem/context text sent per item; scores don't need the full thread
+MAX_WIRE_CHARS = 300
+
 class PainAnalyzer:
-    def __init__(self):
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            self.client = None
-        else:
-            self.client = OpenAI(api_key=api_key)
+    def __init__(self, max_concurrency=4, max_retries=2, use_dedup=True):
+        self.client = get_client()
+        self.governor = get_governor()
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.dedup_index = get_default_index() if use_dedup else None
 
     def calculate_scores(self, pain_points):
         """
         Calculates scores for a list of pain points.
+        Items are batched by token size and batches are scored concurrently;
+        each item gets a stable id so results are re-joined in input order.
+        Batches that still fail after retries are logged and left out.
+        Near-duplicates are merged first; their mention count replaces the
+        model's guess for frequency_score. Problems scored in an earlier run
+        reuse their stored scores instead of being sent again.
+        """
+        pain_points = self._prepare(pain_points)
+        if not self.client or not pain_points:
+            return pain_points
+
+        known = self._known_scores(pain_points)
+        batches = self._make_batches(pain_points, skip=known)
+        logger.info(f"Scoring {len(pain_points) - len(known)} pain points in {len(batches)} batches ({len(known)} already scored)")
+
+        results = []
+        if batches:
+            workers = min(self.max_concurrency, len(batches))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(self._score_batch_with_retry, batches))
+        self._remember_scores(pain_points, results)
+        return self._join(pain_points, results + [known])
+
+    async def calculate_scores_async(self, pain_points):
         """
+        Async variant of calculate_scores() on the shared AsyncOpenAI client.
+        """
+        pain_points = self._prepare(pain_points)
+        if not self.client or not pain_points:
+            return pain_points
+
+        known = self._known_scores(pain_points)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def score(batch):
+            async with semaphore:
+                return await self._score_batch_with_retry_async(batch)
+
+        results = list(await asyncio.gather(*(score(batch) for batch in self._make_batches(pain_points, skip=known))))
+        self._remember_scores(pain_points, results)
+        return self._join(pain_points, results + [known])
+
+    def _prepare(self, pain_points):
+        """
+        Merges near-duplicates and, without an API client, applies mock scores.
+        """
+        if self.dedup_index:
+            pain_points = self.dedup_index.merge_duplicates(pain_points)
+
         if not self.client:
             # Mock scoring
             for p in pain_points:
@@ -32,51 +98,268 @@ class PainAnalyzer:
                 p['willingness_to_pay_score'] = 6
                 p['frequency_score'] = 5
                 p['role_value_score'] = 5
-            return pain_points
+            return [self._apply_mention_frequency(p) for p in pain_points]
+        return pain_points
+
+    def _known_scores(self, pain_points):
+        """
+        {position: scores} for problems the dedup index already has scores for.
+        """
+        if not self.dedup_index:
+            return {}
+        stored = self.dedup_index.scores_for({p['dedup_id'] for p in pain_points if p.get('dedup_id') is not None})
+        return {i: stored[p['dedup_id']] for i, p in enumerate(pain_points) if p.get('dedup_id') in stored}
+
+    def _remember_scores(self, pain_points, results):
+        """
+        Stores freshly scored problems in the dedup index for later runs.
+        """
+        if not self.dedup_index:
+            return
+        fresh = {}
+        for batch_scores in results:
+            for i, scores in batch_scores.items():
+                if pain_points[i].get('dedup_id') is not None:
+                    fresh[pain_points[i]['dedup_id']] = scores
+        if fresh:
+            self.dedup_index.store_scores(fresh)
+
+    def _join(self, pain_points, results):
+        """
+        Re-joins {id: scores} results onto the original records in input order.
+        """
+        scores = {}
+        for batch_scores in results:
+            scores.update(batch_scores)
+
+        scored = []
+        for i, pain in enumerate(pain_points):
+            if i in scores:
+                scored.append(self._apply_mention_frequency({**pain, **scores[i]}))
+        if len(scored) < len(pain_points):
+            logger.error(f"{len(pain_points) - len(scored)} pain points could not be scored")
+        return scored
+
+    @staticmethod
+    def _apply_mention_frequency(pain):
+        """
+        Derives frequency_score (1-10) from how often the problem was seen:
+        1 mention -> 1, doubling the mentions adds 2 points.
+        """
+        count = pain.get('mention_count')
+        if count:
+            pain['frequency_score'] = min(10, 1 + round(2 * math.log2(count)))
+        return pain
+
+    def _make_batches(self, pain_points, skip=()):
+        """
+        Packs (id, pain_point) pairs into batches of at most MAX_BATCH_TOKENS,
+        leaving out the ids in `skip`.
+        """
+        batches, current, current_tokens = [], [], 0
+        for i, pain in enumerate(pain_points):
+            if i in skip:
+                continue
+            tokens = estimate_tokens(json.dumps(self._wire_item(i, pain), separators=(',', ':')))
+            if current and current_tokens + tokens > MAX_BATCH_TOKENS:
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append((i, pain))
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    def _score_batch_with_retry(self, batch):
+        """
+        Scores one batch, re-asking only for items the model left out or
+        answered invalidly. A failed request is not retried here: the governor
+        has already retried it if the error was retryable.
+        Returns {id: scores}.
+        """
+        scores = {}
+        pending = batch
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self._score_batch(pending)
+            except Exception as e:
+                logger.error(f"Error scoring pain points: {e}")
+                break
+            scores.update(self._parse_scores(pending, response))
+            pending = [(i, pain) for i, pain in pending if i not in scores]
+            if not pending:
+                break
+            if attempt < self.max_retries:
+                logger.warning(f"{len(pending)} pain points missing from the answer; asking again ({attempt + 1}/{self.max_retries})")
+        return scores
 
-        # Batch processing for efficiency
+    async def _score_batch_with_retry_async(self, batch):
+        scores = {}
+        pending = batch
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = await self.governor.achat(get_async_client(), priority='background', **self._score_request(pending))
+            except Exception as e:
+                logger.error(f"Error scoring pain points: {e}")
+                break
+            scores.update(self._parse_scores(pending, response))
+            pending = [(i, pain) for i, pain in pending if i not in scores]
+            if not pending:
+                break
+            if attempt < self.max_retries:
+                logger.warning(f"{len(pending)} pain points missing from the answer; asking again ({attempt + 1}/{self.max_retries})")
+        return scores
+
+    def _score_batch(self, batch):
+        """
+        Single governed scoring request; returns the raw response.
+        """
+        return self.governor.chat(self.client, priority='background', **self._score_request(batch))
+
+    @staticmethod
+    def _wire_item(short_id, pain):
+        """
+        Compact encoding of one pain point: short id plus only what the model
+        needs to score it.
+        """
+        item = {'i': short_id, 'p': str(pain.get('problem', ''))[:MAX_WIRE_CHARS]}
+        if pain.get('context'):
+            item['c'] = str(pain['context'])[:MAX_WIRE_CHARS]
+        if pain.get('frustration_level'):
+            item['f'] = pain['frustration_level']
+        return item
+
+    def _score_request(self, batch):
+        # Short ids are positions in the batch; _parse_scores maps them back
+        items = [self._wire_item(k, pain) for k, (_, pain) in enumerate(batch)]
+        prompt = f"""
+        Rate each pain point on a scale of 1-10 for each criterion, in this order:
+        1. pain_score (Intensity of suffering)
+        2. urgency_score (How bad they need a fix NOW)
+        3. frequency_score (How often it happens)
+        4. role_value_score (Value of the person suffering, e.g. CEO > Intern)
+        5. willingness_to_pay_score (Likelihood to pay for a solution)
+
+        Items have i (id), p (problem), c (context), f (frustration level).
+        Input: {json.dumps(items, separators=(',', ':'))}
+
+        Return a JSON object {{"s": [[i, pain, urgency, frequency, role_value, willingness_to_pay], ...]}} with one row per item and nothing else.
+        """
+        return dict(
+            model="gpt-3.5-turbo",
+            messages=[
+                {"role": "system", "content": "You are a product strategist scoring valid market problems."},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.2,
+            response_format={ "type": "json_object" }
+        )
+
+    @staticmethod
+    def _parse_scores(batch, response):
+        """
+        Maps the compact rows back to {id: scores}. Rows with unknown ids or
+        missing scores, and answers that are not valid JSON, are skipped (and
+        retried by the caller).
+        """
+        try:
+            data = json.loads(response.choices[0].message.content)
+        except (ValueError, TypeError) as e:
+            logger.warning(f"Invalid scoring answer: {e}")
+            return {}
+        if isinstance(data, dict):
+            data = data.get('s') or next((v for v in data.values() if isinstance(v, list)), [])
+        if not isinstance(data, list):
+            return {}
+
+        scores = {}
+        for row in data:
+            if isinstance(row, dict):
+                # Tolerate the verbose object form
+                row = [row.get('i', row.get('id'))] + [row.get(key) for key in SCORE_KEYS]
+            if not isinstance(row, list) or len(row) != len(SCORE_KEYS) + 1:
+                continue
+            short_id, values = row[0], row[1:]
+            if not isinstance(short_id, int) or not 0 <= short_id < len(batch):
+                continue
+            if all(isinstance(v, (int, float)) for v in values):
+                scores[batch[short_id][0]] = dict(zip(SCORE_KEYS, values))
+        return scores
+
+    def cluster_pains(self, scored_pains, method='local', k=None):
+        """
+        Clusters pain points into potential product opportunities.
+        method='local' groups them with TF-IDF + cosine k-means (deterministic,
+        scores computed numerically) and only asks the LLM to name each cluster;
+        method='llm' sends everything to the model as before.
+        """
+        if method == 'llm':
+            return self._cluster_pains_llm(scored_pains)
+
+        clusters = cluster_pain_points(scored_pains, k=k)
+        if not clusters:
+            return []
+        names = self._name_clusters(clusters) if self.client else {}
+
+        results = []
+        for i, cluster in enumerate(clusters):
+            named = names.get(i, {})
+            results.append({
+                "cluster_name": named.get('cluster_name') or ' / '.join(cluster['top_terms'][:3]).title(),
+                "aggregate_pain_score": cluster['aggregate_pain_score'],
+                "contained_pain_ids": cluster['contained_pain_ids'],
+                "potential_solution_hypothesis": named.get('potential_solution_hypothesis', ''),
+                "top_terms": cluster['top_terms']
+            })
+        return results
+
+    def _name_clusters(self, clusters):
+        """
+        One LLM call naming every local cluster from its top terms and sample problems.
+        Returns {cluster_index: {'cluster_name', 'potential_solution_hypothesis'}}.
+        """
+        summary = [
+            {"i": i, "t": c['top_terms'], "p": [str(p)[:MAX_WIRE_CHARS] for p in c['sample_problems']], "n": len(c['contained_pain_ids'])}
+            for i, c in enumerate(clusters)
+        ]
         prompt = f"""
-        Rate the following pain points on a scale of 1-10 for each criterion:
-        - pain_score (Intensity of suffering)
-        - urgency_score (How bad they need a fix NOW)
-        - frequency_score (How often it happens)
-        - role_value_score (Value of the person suffering, e.g. CEO > Intern)
-        - willingness_to_pay_score (Likelihood to pay for a solution)
+        Each item below is a group of similar user pain points: i (id), t (top terms), p (sample problems), n (size).
+        For each group, provide:
+        - a cluster name (Tool, Workflow, Role or Desired Outcome it revolves around)
+        - a potential solution hypothesis (A simple digital product that would solve it)
 
-        Input: {json.dumps(pain_points)}
+        Input: {json.dumps(summary, separators=(',', ':'))}
 
-        Return a JSON list of objects, preserving original data and adding the scores.
+        Return a JSON object {{"c": [[i, "cluster name", "solution hypothesis"], ...]}} with one row per group.
         """
-        
+
         try:
-            response = self.client.chat.completions.create(
+            response = self.governor.chat(
+                self.client, priority='background',
                 model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are a product strategist scoring valid market problems."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.2,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0.4,
                 response_format={ "type": "json_object" }
             )
             data = json.loads(response.choices[0].message.content)
-            # Handle list wrapper if present
-            if 'scored_pain_points' in data:
-                return data['scored_pain_points']
-            if isinstance(data, list):
-                return data
-            for k, v in data.items():
-                if isinstance(v, list):
-                    return v
-            return pain_points
+            names = {}
+            for row in data.get('c') or data.get('clusters') or []:
+                if isinstance(row, dict):
+                    row = [row.get('i', row.get('id')), row.get('cluster_name'), row.get('potential_solution_hypothesis')]
+                if isinstance(row, list) and len(row) == 3 and isinstance(row[0], int):
+                    names[row[0]] = {'cluster_name': row[1], 'potential_solution_hypothesis': row[2]}
+            return names
 
         except Exception as e:
-            logger.error(f"Error scoring pain points: {e}")
-            raise  # Re-raise in production instead of falling back to MOCK
-            return pain_points
+            # The clusters stand on their own; they fall back to their top terms as names
+            logger.error(f"Error naming clusters: {e}")
+            return {}
 
-    def cluster_pains(self, scored_pains):
+    def _cluster_pains_llm(self, scored_pains):
         """
-        Clusters pain points into potential product opportunities.
+        Original LLM-only clustering. Only ids and problem text go out; the
+        model returns member ids per cluster and the aggregate score is
+        computed locally.
         """
         if not self.client:
             # Mock clustering
@@ -87,34 +370,49 @@ class PainAnalyzer:
                 "potential_solution_hypothesis": "A python script that converts PDF bank statements to Excel."
             }]
 
+        items = [{"i": i, "p": str(pain.get('problem', ''))[:MAX_WIRE_CHARS]} for i, pain in enumerate(scored_pains)]
         prompt = f"""
-        Group the following scored pain points into clusters based on:
+        Group the following pain points (i = id, p = problem) into clusters based on:
         - Tool (e.g. Problems with Excel)
         - Workflow (e.g. Lead Generation issues)
         - Role (e.g. Marketing Manager struggles)
         - Desired Outcome (e.g. Want to save time on reporting)
 
-        For each cluster, provide:
-        - cluster_name
-        - aggregate_pain_score (average)
-        - contained_pain_ids (or indices)
-        - potential_solution_hypothesis
+        For each cluster, provide its name, the ids it contains and a potential solution hypothesis.
+
+        Input: {json.dumps(items, separators=(',', ':'))}
 
-        Input: {json.dumps(scored_pains)}
-        
-        Return JSON object with key 'clusters'.
+        Return a JSON object {{"c": [["cluster name", [ids], "solution hypothesis"], ...]}}.
         """
-        
+
         try:
-            response = self.client.chat.completions.create(
+            response = self.governor.chat(
+                self.client, priority='background',
                 model="gpt-3.5-turbo",
                 messages=[{"role": "user", "content": prompt}],
                 temperature=0.4,
                 response_format={ "type": "json_object" }
             )
             data = json.loads(response.choices[0].message.content)
-            return data.get('clusters', [])
 
         except Exception as e:
             logger.error(f"Error clustering pains: {e}")
             raise  # Re-raise in production instead of falling back to MOCK
+
+        clusters = []
+        for row in data.get('c') or data.get('clusters') or []:
+            if isinstance(row, dict):
+                row = [row.get('cluster_name'), row.get('contained_pain_ids'), row.get('potential_solution_hypothesis')]
+            if not isinstance(row, list) or len(row) != 3 or not isinstance(row[1], list):
+                continue
+            ids = [i for i in row[1] if isinstance(i, int) and 0 <= i < len(scored_pains)]
+            if not ids:
+                continue
+            pain_scores = [scored_pains[i]['pain_score'] for i in ids if isinstance(scored_pains[i].get('pain_score'), (int, float))]
+            clusters.append({
+                "cluster_name": row[0],
+                "aggregate_pain_score": round(sum(pain_scores) / len(pain_scores), 2) if pain_scores else None,
+                "contained_pain_ids": ids,
+                "potential_solution_hypothesis": row[2]
+            })
+        return clusters
@@ -0,0 +1,321 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+import numpy as np
+try:
+    from execucao.utils import setup_logger
+except ImportError:
+    import sys
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from execucao.utils import setup_logger
+
+from radar.ranking import load_ranking_config, to_float_array, to_number
+
+logger = setup_logger('PainStore')
+
+DEFAULT_STORE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'temp', 'pain_store.sqlite')
+
+SCORE_KEYS = ['pain_score', 'urgency_score', 'frequency_score', 'role_value_score', 'willingness_to_pay_score']
+
+# Equal weights until a ranking configuration says otherwise
+DEFAULT_WEIGHTS = {key: 1 / len(SCORE_KEYS) for key in SCORE_KEYS}
+
+DAY = 86400
+
+
+def fingerprint(problem):
+    """
+    Stable key for a pain point: hash of its normalized problem text.
+    """
+    normalized = re.sub(r'[^a-z0-9]+', ' ', str(problem).lower()).strip()
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+
+
+def weighted_score(pain, weights=None):
+    weights = weights or DEFAULT_WEIGHTS
+    return sum(to_number(pain.get(key), 0) * weight for key, weight in weights.items())
+
+
+class PainStore:
+    """
+    SQLite store of scored pain points and clusters so results persist across
+    runs. Pain points are keyed by their normalized problem text; upserting a
+    known problem refreshes its scores and last_seen. The weighted score is
+    stored with each row so top-N queries run on an index.
+    The stored score is the plain weighted sum of the raw 1-10 scores, with
+    missing scores counted as 0. RankingEngine.rank_store() applies the
+    configured normalizations and missing_value instead, and min-max or
+    z-score columns depend on the whole population, so the two orders can
+    differ; use rank_store() for the configured ranking.
+    """
+    def __init__(self, path=None, weights=None):
+        self.path = path or DEFAULT_STORE_PATH
+        self.weights = weights or DEFAULT_WEIGHTS
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # Off by default in SQLite; cluster_members relies on ON DELETE CASCADE
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS pain_points (
+                id INTEGER PRIMARY KEY,
+                fingerprint TEXT NOT NULL UNIQUE,
+                problem TEXT NOT NULL,
+                context TEXT,
+                frustration_level TEXT,
+                source_url TEXT,
+                pain_score REAL,
+                urgency_score REAL,
+                frequency_score REAL,
+                role_value_score REAL,
+                willingness_to_pay_score REAL,
+                weighted_score REAL NOT NULL DEFAULT 0,
+                mention_count INTEGER NOT NULL DEFAULT 1,
+                first_seen REAL NOT NULL,
+                last_seen REAL NOT NULL,
+                data TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_pain_last_seen ON pain_points(last_seen);
+            CREATE INDEX IF NOT EXISTS idx_pain_weighted ON pain_points(weighted_score DESC);
+            CREATE INDEX IF NOT EXISTS idx_pain_source ON pain_points(source_url);
+
+            CREATE TABLE IF NOT EXISTS clusters (
+                id INTEGER PRIMARY KEY,
+                cluster_name TEXT NOT NULL UNIQUE,
+                aggregate_pain_score REAL,
+                potential_solution_hypothesis TEXT,
+                top_terms TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_clusters_score ON clusters(aggregate_pain_score DESC);
+
+            CREATE TABLE IF NOT EXISTS cluster_members (
+                cluster_id INTEGER NOT NULL REFERENCES clusters(id) ON DELETE CASCADE,
+                pain_id INTEGER NOT NULL REFERENCES pain_points(id) ON DELETE CASCADE,
+                PRIMARY KEY (cluster_id, pain_id)
+            );
+            CREATE INDEX IF NOT EXISTS idx_members_pain ON cluster_members(pain_id);
+        """)
+        self.conn.commit()
+
+    def _row(self, pain, now):
+        extra = {k: v for k, v in pain.items() if k not in SCORE_KEYS and k not in ('problem', 'context', 'frustration_level', 'source_url', 'mention_count')}
+        return (
+            fingerprint(pain['problem']), str(pain['problem']), pain.get('context'), pain.get('frustration_level'),
+            pain.get('source_url'), *(pain.get(key) for key in SCORE_KEYS), weighted_score(pain, self.weights),
+            int(pain.get('mention_count') or 1), now, now, json.dumps(extra)
+        )
+
+    def upsert_pain_points(self, pain_points, seen_at=None):
+        """
+        Inserts or refreshes pain points in one transaction. Known problems keep
+        their first_seen and source_url; scores, mention_count and last_seen are
+        updated. Returns the row ids in input order (None for skipped items).
+        """
+        now = seen_at or time.time()
+        rows, positions = [], []
+        for i, pain in enumerate(pain_points):
+            if str(pain.get('problem', '')).strip():
+                rows.append(self._row(pain, now))
+                positions.append(i)
+
+        with self._lock:
+            self.conn.executemany("""
+                INSERT INTO pain_points (
+                    fingerprint, problem, context, frustration_level, source_url,
+                    pain_score, urgency_score, frequency_score, role_value_score, willingness_to_pay_score,
+                    weighted_score, mention_count, first_seen, last_seen, data
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(fingerprint) DO UPDATE SET
+                    context = COALESCE(excluded.context, context),
+                    frustration_level = COALESCE(excluded.frustration_level, frustration_level),
+                    source_url = COALESCE(source_url, excluded.source_url),
+                    pain_score = COALESCE(excluded.pain_score, pain_score),
+                    urgency_score = COALESCE(excluded.urgency_score, urgency_score),
+                    frequency_score = COALESCE(excluded.frequency_score, frequency_score),
+                    role_value_score = COALESCE(excluded.role_value_score, role_value_score),
+                    willingness_to_pay_score = COALESCE(excluded.willingness_to_pay_score, willingness_to_pay_score),
+                    weighted_score = excluded.weighted_score,
+                    mention_count = MAX(mention_count, excluded.mention_count),
+                    last_seen = MAX(last_seen, excluded.last_seen),
+                    data = excluded.data
+            """, rows)
+            # Rows upserted without some scores keep the stored ones; score what was kept
+            partial = [row[0] for row in rows if any(value is None for value in row[5:5 + len(SCORE_KEYS)])]
+            if partial:
+                self._refresh_weighted_scores(partial)
+            self.conn.commit()
+            ids = self._ids_for([row[0] for row in rows])
+
+        result = [None] * len(pain_points)
+        for position, row in zip(positions, rows):
+            result[position] = ids.get(row[0])
+        logger.info(f"Upserted {len(rows)} pain points")
+        return result
+
+    def _refresh_weighted_scores(self, fingerprints):
+        """
+        Recomputes weighted_score from the stored scores. Caller must hold the lock.
+        """
+        updates = []
+        for start in range(0, len(fingerprints), 500):
+            part = fingerprints[start:start + 500]
+            query = f"SELECT fingerprint, {', '.join(SCORE_KEYS)} FROM pain_points WHERE fingerprint IN ({','.join('?' * len(part))})"
+            for row in self.conn.execute(query, part):
+                updates.append((weighted_score(dict(zip(SCORE_KEYS, row[1:])), self.weights), row[0]))
+        self.conn.executemany("UPDATE pain_points SET weighted_score = ? WHERE fingerprint = ?", updates)
+
+    def _ids_for(self, fingerprints):
+        ids = {}
+        for start in range(0, len(fingerprints), 500):
+            part = fingerprints[start:start + 500]
+            query = f"SELECT fingerprint, id FROM pain_points WHERE fingerprint IN ({','.join('?' * len(part))})"
+            ids.update(self.conn.execute(query, part).fetchall())
+        return ids
+
+    def upsert_clusters(self, clusters, pain_points):
+        """
+        Stores clusters from PainAnalyzer.cluster_pains(). `pain_points` is the
+        list the clusters were built from; 'contained_pain_ids' index into it.
+        Membership of an existing cluster is replaced. Returns the cluster ids.
+        """
+        pain_ids = self.upsert_pain_points(pain_points)
+        now = time.time()
+        cluster_ids = []
+        with self._lock:
+            for cluster in clusters:
+                self.conn.execute("""
+                    INSERT INTO clusters (cluster_name, aggregate_pain_score, potential_solution_hypothesis, top_terms, created_at, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(cluster_name) DO UPDATE SET
+                        aggregate_pain_score = excluded.aggregate_pain_score,
+                        potential_solution_hypothesis = excluded.potential_solution_hypothesis,
+                        top_terms = excluded.top_terms,
+                        updated_at = excluded.updated_at
+                """, (cluster['cluster_name'], cluster.get('aggregate_pain_score'), cluster.get('potential_solution_hypothesis'),
+                      json.dumps(cluster.get('top_terms', [])), now, now))
+                cluster_id = self.conn.execute("SELECT id FROM clusters WHERE cluster_name = ?", (cluster['cluster_name'],)).fetchone()[0]
+                members = {pain_ids[i] for i in cluster.get('contained_pain_ids', [])
+                           if isinstance(i, int) and 0 <= i < len(pain_ids) and pain_ids[i] is not None}
+                self.conn.execute("DELETE FROM cluster_members WHERE cluster_id = ?", (cluster_id,))
+                self.conn.executemany("INSERT INTO cluster_members (cluster_id, pain_id) VALUES (?, ?)",
+                                      [(cluster_id, pain_id) for pain_id in members])
+                cluster_ids.append(cluster_id)
+            self.conn.commit()
+        return cluster_ids
+
+    @staticmethod
+    def _to_dict(row):
+        pain = json.loads(row['data'] or '{}')
+        pain.update({key: row[key] for key in row.keys() if key != 'data'})
+        return pain
+
+    def top_pain_points(self, n=50, days=7, weights=None):
+        """
+        Top `n` pain points by weighted score last seen within `days` (None = all time).
+        Custom `weights` are applied in the query instead of the stored score.
+        Raw scores are not normalized here; see RankingEngine.rank_store().
+        """
+        params = []
+        where = ""
+        if days is not None:
+            where = "WHERE last_seen >= ?"
+            params.append(time.time() - days * DAY)
+        order = "weighted_score"
+        if weights:
+            order = ' + '.join(f"COALESCE({key}, 0) * ?" for key in weights if key in SCORE_KEYS) or order
+            params.extend(weights[key] for key in weights if key in SCORE_KEYS)
+        params.append(n)
+        with self._lock:
+            rows = self.conn.execute(f"SELECT * FROM pain_points {where} ORDER BY {order} DESC, id LIMIT ?", params).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def top_clusters(self, n=10, days=None):
+        """
+        Top `n` clusters by aggregate_pain_score, optionally only those updated within `days`.
+        """
+        params = []
+        where = ""
+        if days is not None:
+            where = "WHERE updated_at >= ?"
+            params.append(time.time() - days * DAY)
+        params.append(n)
+        with self._lock:
+            rows = self.conn.execute(f"SELECT * FROM clusters {where} ORDER BY aggregate_pain_score DESC, id LIMIT ?", params).fetchall()
+            results = []
+            for row in rows:
+                cluster = dict(row)
+                cluster['top_terms'] = json.loads(cluster['top_terms'] or '[]')
+                cluster['pain_ids'] = [r[0] for r in self.conn.execute(
+                    "SELECT pain_id FROM cluster_members WHERE cluster_id = ? ORDER BY pain_id", (row['id'],))]
+                results.append(cluster)
+        return results
+
+    def cluster_pain_points(self, cluster_id):
+        with self._lock:
+            rows = self.conn.execute("""
+                SELECT p.* FROM pain_points p JOIN cluster_members m ON m.pain_id = p.id
+                WHERE m.cluster_id = ? ORDER BY p.weighted_score DESC
+            """, (cluster_id,)).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def iter_scores(self, days=None, criteria=None):
+        """
+        Yields (id, score tuple in `criteria` order, default SCORE_KEYS) rows, for bulk ranking.
+        """
+        criteria = [c for c in (criteria or SCORE_KEYS) if c in SCORE_KEYS]
+        params = []
+        where = ""
+        if days is not None:
+            where = "WHERE last_seen >= ?"
+            params.append(time.time() - days * DAY)
+        with self._lock:
+            rows = self.conn.execute(f"SELECT id, {', '.join(criteria)} FROM pain_points {where}", params).fetchall()
+        for row in rows:
+            yield row[0], tuple(row[1:])
+
+    def score_matrix(self, days=None, criteria=None):
+        """
+        (ids, scores) as NumPy arrays for bulk ranking: int64 ids and a float64
+        (rows x criteria) matrix with NaN for missing or non-numeric scores.
+        """
+        criteria = [c for c in (criteria or SCORE_KEYS) if c in SCORE_KEYS]
+        params = []
+        where = ""
+        if days is not None:
+            where = "WHERE last_seen >= ?"
+            params.append(time.time() - days * DAY)
+        with self._lock:
+            rows = self.conn.execute(f"SELECT id, {', '.join(criteria)} FROM pain_points {where}", params).fetchall()
+        if not rows:
+            return np.zeros(0, dtype=np.int64), np.zeros((0, len(criteria)), dtype=np.float64)
+        ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        columns = list(zip(*rows))[1:]
+        return ids, np.column_stack([to_float_array(column, np.nan) for column in columns])
+
+    def count(self):
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM pain_points").fetchone()[0]
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+def get_default_store():
+    """
+    Process-wide pain store shared by the radar stages, weighted like the
+    ranking configuration in diretivas/radar/ranking_weights.json.
+    """
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = PainStore(weights=load_ranking_config()['weights'])
+        return _default_store
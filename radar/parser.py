@@ -1,48 +1,38 @@
 import os
+import re
 import json
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 try:
     from execucao.utils import setup_logger, load_env_file
+    from execucao.llm_governor import get_governor
+    from execucao.llm_client import get_client, get_async_client
 except ImportError:
     import sys
     sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
     from execucao.utils import setup_logger, load_env_file
+    from execucao.llm_governor import get_governor
+    from execucao.llm_client import get_client, get_async_client
 
-from bs4 import BeautifulSoup
-from openai import OpenAI
+from radar.html_text import extract_text, looks_like_html
+from radar.llm_memo import get_default_memo
+from radar.chunking import chunk_text
+from radar.triage import PainTriage
 
 logger = setup_logger('ParserAgent')
 load_env_file()
 
-class ParserAgent:
-    def __init__(self):
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            logger.error("OPENAI_API_KEY not configured. Pain point parsing requires this environment variable.")
-            raise ValueError("Pain point parsing requires OPENAI_API_KEY environment variable")
-        
-        self.client = OpenAI(api_key=api_key)
-        logger.info("✅ OpenAI client initialized for Parser")
-
-    def extract_pain_points(self, text_content, source_url=""):
-        """
-        Extracts structured pain points from text using LLM.
-        """
-        # Client validation happens in __init__, so this should never be None in production
+MODEL = "gpt-3.5-turbo" # Or gpt-4
 
-        if len(text_content) > 10000:
-             # Try to clean it better first if it's raw HTML disguised as text
-             try:
-                 soup = BeautifulSoup(text_content, 'html.parser')
-                 # Remove noise
-                 for noise in soup(['script', 'style', 'nav', 'footer', 'header', 'aside', 'iframe', 'ads']):
-                     noise.decompose()
-                 text_content = soup.get_text(separator=' ', strip=True)
-             except:
-                 pass # If it fails, use as is
+# Chunk budget leaves room for the prompt template and the JSON answer in a 16k context
+MAX_CHUNK_TOKENS = 3000
+CHUNK_OVERLAP_TOKENS = 150
+MAX_CHUNKS = 20
+MAX_TEXT_CHARS = 400000
 
-             text_content = text_content[:10000] # Truncate for token limits
+SYSTEM_PROMPT = "You are a market research analyst extracting user pain points."
 
-        prompt = f"""
+PAIN_POINT_PROMPT = """
         Analyze the following text from {source_url} and extract user pain points, frustrations, and problems.
         Focus on:
         - Description of the problem
@@ -60,36 +50,174 @@ class ParserAgent:
         {text_content}
         """
 
+class ParserAgent:
+    def __init__(self, use_memo=True, max_concurrency=4, triage=None, drop_low_signal=False):
+        self.client = get_client()
+        if not self.client:
+            logger.error("OPENAI_API_KEY not configured. Pain point parsing requires this environment variable.")
+            raise ValueError("Pain point parsing requires OPENAI_API_KEY environment variable")
+        self.governor = get_governor()
+        self.memo = get_default_memo() if use_memo else None
+        self.max_concurrency = max_concurrency
+        # The triage picks which chunks to keep when a page exceeds MAX_CHUNKS; with
+        # drop_low_signal, pages and chunks below its threshold never reach the LLM
+        self.triage = PainTriage() if triage is None else triage
+        self.drop_low_signal = drop_low_signal
+        logger.info("✅ OpenAI client initialized for Parser")
+
+    def extract_pain_points(self, text_content, source_url=""):
+        """
+        Extracts structured pain points from text using LLM.
+        Long text is split into overlapping token-budgeted chunks that are
+        extracted concurrently; the results are merged and de-duplicated.
+        """
+        # Client validation happens in __init__, so this should never be None in production
+        chunks = self._prepare_chunks(text_content, source_url)
+        if len(chunks) <= 1:
+            return self._merge([self._extract_chunk(chunk, source_url) for chunk in chunks])
+
+        logger.info(f"Extracting {len(chunks)} chunks from {source_url or 'text'}")
+        workers = min(self.max_concurrency, len(chunks))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(lambda chunk: self._extract_chunk(chunk, source_url), chunks))
+        return self._merge(results)
+
+    async def extract_pain_points_async(self, text_content, source_url=""):
+        """
+        Async variant of extract_pain_points() on the shared AsyncOpenAI client.
+        """
+        chunks = self._prepare_chunks(text_content, source_url)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def extract(chunk):
+            async with semaphore:
+                return await self._extract_chunk_async(chunk, source_url)
+
+        return self._merge(await asyncio.gather(*(extract(chunk) for chunk in chunks)))
+
+    def _prepare_chunks(self, text_content, source_url=""):
+        # Only raw HTML needs extracting; text from FetchAgent.clean is already clean
+        if looks_like_html(text_content):
+            try:
+                text_content = extract_text(text_content, max_chars=MAX_TEXT_CHARS)
+            except Exception:
+                pass # If it fails, use as is
+
+        text_content = text_content[:MAX_TEXT_CHARS]
+        if self.triage and self.drop_low_signal and text_content.strip():
+            score = self.triage.score(text_content)
+            if score < self.triage.threshold:
+                logger.info(f"Triage skipped {source_url or 'text'} (score {score:.2f} < {self.triage.threshold})")
+                return []
+
+        chunks = chunk_text(text_content, MAX_CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS)
+        if self.triage and self.drop_low_signal and len(chunks) > 1:
+            chunks, dropped = self.triage.split(chunks)
+            if dropped:
+                logger.info(f"Triage skipped {len(dropped)} low-signal chunks of {source_url or 'text'}")
+        if len(chunks) > MAX_CHUNKS:
+            if self.triage:
+                logger.warning(f"{source_url or 'text'} split into {len(chunks)} chunks; only the {MAX_CHUNKS} with the strongest pain signal are analyzed")
+                keep = self.triage.prioritize(list(range(len(chunks))), text=lambda i: chunks[i])[:MAX_CHUNKS]
+                chunks = [chunks[i] for i in sorted(keep)]
+            else:
+                logger.warning(f"{source_url or 'text'} split into {len(chunks)} chunks; only the first {MAX_CHUNKS} are analyzed")
+                chunks = chunks[:MAX_CHUNKS]
+        return chunks
+
+    def _memo_lookup(self, text_content, source_url=""):
+        """
+        Returns (memo_key, cached_result) for a chunk, keyed by hash(model, prompt template, text).
+        """
+        if not self.memo:
+            return None, None
+        memo_key = self.memo.key_for(MODEL, SYSTEM_PROMPT, PAIN_POINT_PROMPT, text_content)
+        cached = self.memo.get(memo_key)
+        if cached is not None:
+            logger.info(f"Memo hit for {source_url or 'text'} ({len(cached)} pain points)")
+        return memo_key, cached
+
+    def _request(self, text_content, source_url=""):
+        prompt = PAIN_POINT_PROMPT.format(source_url=source_url, text_content=text_content)
+        return dict(
+            model=MODEL,
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.3,
+            response_format={ "type": "json_object" }
+        )
+
+    def _extract_chunk(self, text_content, source_url=""):
+        """
+        Single chat call for one chunk, memoized.
+        """
+        memo_key, cached = self._memo_lookup(text_content, source_url)
+        if cached is not None:
+            return cached
+
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo", # Or gpt-4
-                messages=[
-                    {"role": "system", "content": "You are a market research analyst extracting user pain points."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3,
-                response_format={ "type": "json_object" }
-            )
-            
-            content = response.choices[0].message.content
-            data = json.loads(content)
-            
-            # Handle potential different json structures (e.g. wrapper keys)
-            if 'pain_points' in data:
-                return data['pain_points']
-            if isinstance(data, list):
-                return data
-            
-            # If it's a dict but not 'pain_points', try to find a list value
-            for key, value in data.items():
-                if isinstance(value, list):
-                    return value
-            
-            return []
+            response = self.governor.chat(self.client, priority='background', **self._request(text_content, source_url))
+            pain_points = self._unwrap(json.loads(response.choices[0].message.content))
+        except Exception as e:
+            logger.error(f"Error parsing with LLM: {e}")
+            raise  # Re-raise in production instead of falling back to MOCK
+
+        if memo_key:
+            self.memo.put(memo_key, pain_points)
+        return pain_points
 
+    async def _extract_chunk_async(self, text_content, source_url=""):
+        memo_key, cached = self._memo_lookup(text_content, source_url)
+        if cached is not None:
+            return cached
+
+        try:
+            response = await self.governor.achat(get_async_client(), priority='background', **self._request(text_content, source_url))
+            pain_points = self._unwrap(json.loads(response.choices[0].message.content))
         except Exception as e:
             logger.error(f"Error parsing with LLM: {e}")
             raise  # Re-raise in production instead of falling back to MOCK
 
+        if memo_key:
+            self.memo.put(memo_key, pain_points)
+        return pain_points
+
+    @staticmethod
+    def _merge(results):
+        """
+        Flattens per-chunk results, dropping pain points whose problem text
+        repeats (chunks overlap, so the same statement can be extracted twice).
+        """
+        merged, seen = [], set()
+        for pain_points in results:
+            for pain in pain_points:
+                if not isinstance(pain, dict):
+                    continue
+                key = re.sub(r'[^a-z0-9]+', ' ', str(pain.get('problem', '')).lower()).strip()
+                if key and key in seen:
+                    continue
+                seen.add(key)
+                merged.append(pain)
+        return merged
+
+    @staticmethod
+    def _unwrap(data):
+        """
+        Handles potential different json structures (e.g. wrapper keys).
+        """
+        if isinstance(data, list):
+            return data
+        if 'pain_points' in data:
+            return data['pain_points']
+        
+        # If it's a dict but not 'pain_points', try to find a list value
+        for key, value in data.items():
+            if isinstance(value, list):
+                return value
+        
+        return []
+
     def run(self, text, url=""):
         return self.extract_pain_points(text, url)
@@ -0,0 +1,280 @@
+import time
+import queue
+import threading
+try:
+    from execucao.utils import setup_logger
+except ImportError:
+    import sys
+    import os
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from execucao.utils import setup_logger
+
+from radar.frontier import url_key
+
+logger = setup_logger('RadarPipeline')
+
+_DONE = object()
+
+class Stage:
+    """
+    One pipeline step. `func(item)` returns an iterable of outputs (empty to drop
+    the item). With `batch_size` set, func receives a list of up to batch_size
+    items instead, flushed early once `max_wait` seconds pass without a full batch.
+    """
+    def __init__(self, name, func, workers=1, queue_size=100, batch_size=None, max_wait=2.0):
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+
+        self.processed = 0
+        self.emitted = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, processed, emitted, busy, failed=False):
+        with self._lock:
+            self.processed += processed
+            self.emitted += emitted
+            self.busy_seconds += busy
+            if failed:
+                self.errors += 1
+
+
+class Pipeline:
+    """
+    Connects stages with bounded queues so a slow stage applies backpressure
+    upstream instead of letting work pile up in memory. Each stage runs its own
+    pool of worker threads; run() yields final outputs as soon as they exist.
+    """
+    def __init__(self, stages):
+        self.stages = stages
+        self.queues = []
+        self.started_at = None
+        self._stop = threading.Event()
+
+    def _put(self, q, item):
+        # Blocking put that still notices a stop request
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _call(self, stage, payload, count, out_queue):
+        started = time.monotonic()
+        emitted, failed = 0, False
+        try:
+            for output in stage.func(payload) or ():
+                if not self._put(out_queue, output):
+                    break
+                emitted += 1
+        except Exception as e:
+            failed = True
+            logger.error(f"Stage '{stage.name}' failed on an item: {e}")
+        stage.record(count, emitted, time.monotonic() - started, failed)
+
+    def _worker(self, stage, in_queue, out_queue, remaining):
+        batch, batch_started = [], None
+        while not self._stop.is_set():
+            timeout = 0.5
+            if batch:
+                timeout = max(0.0, min(timeout, stage.max_wait - (time.monotonic() - batch_started)))
+            try:
+                item = in_queue.get(timeout=timeout)
+            except queue.Empty:
+                if batch and time.monotonic() - batch_started >= stage.max_wait:
+                    self._call(stage, batch, len(batch), out_queue)
+                    batch = []
+                continue
+
+            if item is _DONE:
+                in_queue.put(_DONE)  # Let sibling workers see it too
+                break
+            if stage.batch_size:
+                if not batch:
+                    batch_started = time.monotonic()
+                batch.append(item)
+                if len(batch) >= stage.batch_size:
+                    self._call(stage, batch, len(batch), out_queue)
+                    batch = []
+            else:
+                self._call(stage, item, 1, out_queue)
+
+        if batch and not self._stop.is_set():
+            self._call(stage, batch, len(batch), out_queue)
+        with remaining[1]:
+            remaining[0] -= 1
+            if remaining[0] == 0:
+                self._put(out_queue, _DONE)
+
+    def _feed(self, inputs, first_queue):
+        for item in inputs:
+            if not self._put(first_queue, item):
+                return
+        self._put(first_queue, _DONE)
+
+    def run(self, inputs):
+        """
+        Streams `inputs` through every stage, yielding outputs of the last one.
+        """
+        self._stop.clear()
+        self.started_at = time.monotonic()
+        self.queues = [queue.Queue(maxsize=stage.queue_size) for stage in self.stages]
+        self.queues.append(queue.Queue(maxsize=self.stages[-1].queue_size))
+
+        threads = [threading.Thread(target=self._feed, args=(inputs, self.queues[0]), daemon=True)]
+        for i, stage in enumerate(self.stages):
+            remaining = [stage.workers, threading.Lock()]
+            for _ in range(stage.workers):
+                threads.append(threading.Thread(
+                    target=self._worker, args=(stage, self.queues[i], self.queues[i + 1], remaining), daemon=True
+                ))
+        for thread in threads:
+            thread.start()
+
+        try:
+            while True:
+                item = self.queues[-1].get()
+                if item is _DONE:
+                    break
+                yield item
+        finally:
+            self._stop.set()
+            for thread in threads:
+                thread.join(timeout=5)
+            logger.info(f"Pipeline finished: {self.stats()}")
+
+    def stats(self):
+        """
+        Per-stage counters and throughput (items processed per wall-clock second).
+        """
+        elapsed = time.monotonic() - self.started_at if self.started_at else 0.0
+        report = {}
+        for i, stage in enumerate(self.stages):
+            report[stage.name] = {
+                'workers': stage.workers,
+                'processed': stage.processed,
+                'emitted': stage.emitted,
+                'errors': stage.errors,
+                'busy_seconds': round(stage.busy_seconds, 2),
+                'throughput_per_s': round(stage.processed / elapsed, 2) if elapsed else 0.0,
+                'queue_depth': self.queues[i].qsize() if self.queues else 0
+            }
+        return report
+
+
+DEFAULT_CONCURRENCY = {
+    'search': 2,
+    'fetch': 8,
+    'clean': 2,
+    'parse': 4,
+    'score': 1
+}
+
+def build_radar_pipeline(search_agent, fetch_agent, parser_agent, pain_analyzer,
+                         concurrency=None, score_batch_size=25, queue_size=50, pain_store=None, frontier=None):
+    """
+    Wires SearchAgent -> FetchAgent -> clean -> ParserAgent -> PainAnalyzer.
+    Feed it search queries; it yields scored pain points with their 'source_url'.
+    With a PainStore, every scored batch is also upserted into it.
+    Pages are deduplicated on their normalized URL but fetched at the URL the
+    search returned, once per run. With a CrawlFrontier, a page is recorded
+    only after it was parsed and its pain points scored, so it is skipped for
+    the freshness window; pages that fail at any stage are released and
+    retried on the next run.
+    """
+    workers = {**DEFAULT_CONCURRENCY, **(concurrency or {})}
+    seen_links = set()
+    seen_lock = threading.Lock()
+    failed_links = set()
+
+    def finish(url, ok):
+        if frontier is None:
+            return
+        if not ok:
+            with seen_lock:
+                failed_links.add(url)
+            frontier.forget(url)
+            return
+        with seen_lock:
+            if url in failed_links:
+                return
+        frontier.record(url)
+
+    def guarded(func):
+        # A page whose stage raises is given back to the frontier
+        def run(page):
+            try:
+                return func(page)
+            except Exception:
+                finish(page if isinstance(page, str) else page[0], False)
+                raise
+        return run
+
+    def search(query):
+        links = []
+        for result in search_agent.run(query):
+            link = result.get('link')
+            if not link:
+                continue
+            if frontier is not None:
+                if frontier.reserve(link):
+                    links.append(link)
+                continue
+            key = url_key(link)
+            with seen_lock:
+                if key in seen_links:
+                    continue
+                seen_links.add(key)
+            links.append(link)
+        return links
+
+    def fetch(url):
+        html = fetch_agent.fetch(url)
+        if not html:
+            finish(url, False)
+        return [(url, html)] if html else []
+
+    def clean(page):
+        url, html = page
+        text = fetch_agent.clean(html)
+        if not text:
+            # Nothing to extract; processing the page again would not help
+            finish(url, True)
+        return [(url, text)] if text else []
+
+    def parse(page):
+        url, text = page
+        pains = parser_agent.extract_pain_points(text, url)
+        if not pains:
+            finish(url, True)
+        return [{**pain, 'source_url': url} for pain in pains]
+
+    def score(batch):
+        urls = {pain['source_url'] for pain in batch}
+        try:
+            scored = pain_analyzer.calculate_scores(batch)
+            if pain_store is not None:
+                pain_store.upsert_pain_points(scored)
+        except Exception:
+            for url in urls:
+                finish(url, False)
+            raise
+        # Scoring drops items it could not score; nothing back means the batch failed
+        for url in urls:
+            finish(url, bool(scored))
+        return scored
+
+    return Pipeline([
+        Stage('search', search, workers['search'], queue_size),
+        Stage('fetch', guarded(fetch), workers['fetch'], queue_size),
+        Stage('clean', guarded(clean), workers['clean'], queue_size),
+        Stage('parse', guarded(parse), workers['parse'], queue_size),
+        Stage('score', score, workers['score'], queue_size, batch_size=score_batch_size)
+    ])
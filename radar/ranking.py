@@ -0,0 +1,188 @@
+import os
+import json
+import math
+from itertools import repeat
+
+import numpy as np
+try:
+    from execucao.utils import setup_logger
+except ImportError:
+    import sys
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from execucao.utils import setup_logger
+
+logger = setup_logger('Ranking')
+
+RADAR_DIRECTIVES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'diretivas', 'radar')
+CRITERIA_PATH = os.path.join(RADAR_DIRECTIVES, 'pain_criteria.json')
+DEFAULT_RANKING_PATH = os.path.join(RADAR_DIRECTIVES, 'ranking_weights.json')
+
+# Criteria in pain_criteria.json are rated 1-10
+SCORE_MIN, SCORE_MAX = 1.0, 10.0
+
+
+def _scale(column):
+    return np.clip((column - SCORE_MIN) / (SCORE_MAX - SCORE_MIN), 0, 1)
+
+def _minmax(column):
+    low, high = column.min(), column.max()
+    if high == low:
+        return np.zeros_like(column)
+    return (column - low) / (high - low)
+
+def _zscore(column):
+    std = column.std()
+    if std == 0:
+        return np.zeros_like(column)
+    return (column - column.mean()) / std
+
+def to_number(value, missing):
+    """
+    A score as a float. LLM answers may carry scores as strings ("7");
+    None, non-numeric ("8/10") and non-finite values are `missing`.
+    """
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return missing
+    return value if math.isfinite(value) else missing
+
+
+def to_float_array(values, missing):
+    """
+    Float64 array of one column of scores. NumPy converts the whole column in
+    one call (None -> NaN, "7" -> 7.0); only a column holding something it
+    cannot parse goes through to_number() value by value. None, NaN,
+    infinities and non-numeric values become `missing`.
+    """
+    try:
+        array = np.array(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        array = np.array([v if type(v) in (int, float) else to_number(v, np.nan) for v in values], dtype=np.float64)
+    if array.ndim != 1:
+        raise ValueError("to_float_array expects a single column of scores")
+    array[~np.isfinite(array)] = missing
+    return array
+
+NORMALIZERS = {
+    'none': lambda column: column,
+    'scale': _scale,
+    'minmax': _minmax,
+    'zscore': _zscore
+}
+
+
+def load_criteria(path=None):
+    with open(path or CRITERIA_PATH, 'r', encoding='utf-8') as f:
+        return list(json.load(f)['scoring_criteria'])
+
+
+def load_ranking_config(path=None, criteria_path=None):
+    """
+    Reads weights and per-criterion normalization. Every criterion from
+    pain_criteria.json is ranked; a criterion without a weight counts 0 and one
+    without a normalization uses 'scale'. Weights are normalized to sum to 1.
+    """
+    criteria = load_criteria(criteria_path)
+    with open(path or DEFAULT_RANKING_PATH, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    weights = data.get('weights', {})
+    unknown = set(weights) - set(criteria)
+    if unknown:
+        logger.warning(f"Ignoring weights for unknown criteria: {sorted(unknown)}")
+
+    normalization = data.get('normalization', {})
+    for criterion, method in normalization.items():
+        if method not in NORMALIZERS:
+            raise ValueError(f"Unknown normalization '{method}' for {criterion}. Use one of {sorted(NORMALIZERS)}")
+
+    total = sum(float(weights.get(c, 0)) for c in criteria) or 1.0
+    return {
+        'criteria': criteria,
+        'weights': {c: float(weights.get(c, 0)) / total for c in criteria},
+        'normalization': {c: normalization.get(c, 'scale') for c in criteria},
+        'missing_value': float(data.get('missing_value', SCORE_MIN))
+    }
+
+
+class RankingEngine:
+    """
+    Ranks pain points by a weighted sum of their normalized criterion scores.
+    Scores are held as float32 column arrays (rows x criteria) so the whole
+    ranking is a handful of vector operations and one argpartition.
+    """
+    def __init__(self, config=None):
+        self.config = config or load_ranking_config()
+        self.criteria = self.config['criteria']
+        self.weights = np.array([self.config['weights'][c] for c in self.criteria], dtype=np.float32)
+
+    def columns(self, pain_points):
+        """
+        Score matrix (len(pain_points) x criteria); missing or invalid scores
+        get the configured missing_value.
+        """
+        missing = self.config['missing_value']
+        count = len(pain_points)
+        matrix = np.empty((count, len(self.criteria)), dtype=np.float32)
+        for col, criterion in enumerate(self.criteria):
+            # map(dict.get, ...) pulls the column without a Python-level loop
+            try:
+                values = list(map(dict.get, pain_points, repeat(criterion, count)))
+            except TypeError:
+                values = [pain.get(criterion) for pain in pain_points]
+            matrix[:, col] = to_float_array(values, missing)
+        return matrix
+
+    def scores(self, matrix):
+        """
+        Opportunity score per row: sum of weight * normalized criterion.
+        """
+        normalized = np.empty_like(matrix, dtype=np.float32)
+        for col, criterion in enumerate(self.criteria):
+            normalized[:, col] = NORMALIZERS[self.config['normalization'][criterion]](matrix[:, col])
+        return normalized @ self.weights
+
+    @staticmethod
+    def top_indices(scores, k):
+        """
+        Indices of the `k` highest scores, best first, without sorting the rest.
+        """
+        k = min(k, len(scores))
+        if k <= 0:
+            return np.array([], dtype=np.int64)
+        if k < len(scores):
+            candidates = np.argpartition(-scores, k - 1)[:k]
+        else:
+            candidates = np.arange(len(scores))
+        # Stable order on ties: higher score first, then lower index
+        return candidates[np.lexsort((candidates, -scores[candidates]))]
+
+    def top_k(self, matrix, k=50):
+        """
+        Returns (indices, scores) of the best `k` rows of a score matrix.
+        """
+        scores = self.scores(matrix)
+        indices = self.top_indices(scores, k)
+        return indices, scores[indices]
+
+    def rank(self, pain_points, k=50):
+        """
+        Top `k` pain points, each copied with its 'opportunity_score'.
+        """
+        if not pain_points:
+            return []
+        indices, scores = self.top_k(self.columns(pain_points), k)
+        return [{**pain_points[i], 'opportunity_score': round(float(s), 4)} for i, s in zip(indices, scores)]
+
+    def rank_store(self, store, k=50, days=None):
+        """
+        Ranks every pain point in a PainStore (optionally last seen within
+        `days`) and returns the top `k` as (pain_id, opportunity_score) pairs.
+        """
+        ids, matrix = store.score_matrix(days, self.criteria)
+        if not len(ids):
+            return []
+        matrix = np.where(np.isnan(matrix), self.config['missing_value'], matrix).astype(np.float32)
+        indices, scores = self.top_k(matrix, k)
+        return [(int(ids[i]), round(float(s), 4)) for i, s in zip(indices, scores)]
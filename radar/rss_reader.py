@@ -1,18 +1,119 @@
+import os
 import feedparser
+import requests
 import time
+import json
+import calendar
+import threading
+from concurrent.futures import ThreadPoolExecutor
 try:
     from execucao.utils import setup_logger
 except ImportError:
     import sys
-    import os
     sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
     from execucao.utils import setup_logger
 
+from radar.http_cache import get_default_cache
+from radar.html_text import extract_text, looks_like_html
+from radar.triage import PainTriage
+
 logger = setup_logger('RSSReader')
 
+DEFAULT_CURSOR_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'temp', 'rss_cursors.json')
+
+class FeedCursorStore:
+    """
+    Persists, per feed, the GUIDs/links already emitted, the newest published
+    timestamp seen and the adaptive polling schedule.
+    """
+    def __init__(self, path=None, max_seen=1000, min_interval=300, max_interval=6 * 3600):
+        self.path = path or DEFAULT_CURSOR_FILE
+        self.max_seen = max_seen
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self._lock = threading.Lock()
+        self.cursors = self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"Discarding unreadable feed cursors: {e}")
+            return {}
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._lock:
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.cursors, f)
+            os.replace(tmp_path, self.path)
+
+    def get(self, feed_url):
+        with self._lock:
+            return self.cursors.setdefault(feed_url, {
+                'seen': [],
+                'last_published': 0,
+                'interval': self.min_interval,
+                'next_poll': 0
+            })
+
+    def is_due(self, feed_url, now=None):
+        return (now or time.time()) >= self.get(feed_url)['next_poll']
+
+    def advance(self, feed_url, new_entries, now=None, failed=False, deferred=None):
+        """
+        Records newly emitted entries and reschedules the feed: the interval halves
+        when the feed produced something and doubles when it was unchanged.
+        A failed poll keeps the current interval so broken feeds are retried
+        at their usual cadence instead of backing off.
+        `deferred` entries (held back by the triage) are not marked seen and
+        stay eligible on later polls even if older than last_published.
+        """
+        now = now or time.time()
+        cursor = self.get(feed_url)
+        with self._lock:
+            previously_deferred = set(cursor.get('deferred', []))
+            if deferred is not None:
+                cursor['deferred'] = [e['guid'] for e in deferred][-self.max_seen:]
+            produced = bool(new_entries) or any(e['guid'] not in previously_deferred for e in deferred or [])
+            if new_entries:
+                cursor['seen'] = (cursor['seen'] + [e['guid'] for e in new_entries])[-self.max_seen:]
+                newest = max(e['published_ts'] or 0 for e in new_entries)
+                cursor['last_published'] = max(cursor['last_published'], newest)
+            if produced:
+                cursor['interval'] = max(self.min_interval, cursor['interval'] // 2)
+            elif not failed:
+                cursor['interval'] = min(self.max_interval, cursor['interval'] * 2)
+            cursor['next_poll'] = now + cursor['interval']
+
+
+def entry_text(entry):
+    """
+    Title and summary of an entry as plain text (summaries are often HTML).
+    """
+    summary = entry.get('summary', '')
+    if looks_like_html(summary):
+        summary = extract_text(summary)
+    return f"{entry.get('title', '')}\n{summary}"
+
+
 class RSSReader:
-    def __init__(self, feeds=None):
+    def __init__(self, feeds=None, use_cache=True, max_workers=8, cursor_store=None, triage=None,
+                 drop_low_signal=False):
         self.feeds = feeds or []
+        self.session = requests.Session()
+        self.session.headers.update({"User-Agent": "microproduct-engine RSSReader/1.0"})
+        self.cache = get_default_cache() if use_cache else None
+        self.max_workers = max_workers
+        self.cursors = cursor_store or FeedCursorStore()
+        # New entries are returned strongest pain signal first; with drop_low_signal,
+        # entries below the triage threshold are held back (not marked seen)
+        self.triage = PainTriage() if triage is None else triage
+        self.drop_low_signal = drop_low_signal
         # Example feeds if none provided
         if not self.feeds:
             self.feeds = [
@@ -21,33 +122,109 @@ class RSSReader:
                 # Add more relevant feeds here
             ]
 
+    def _download(self, feed_url):
+        """
+        Downloads the raw feed document, revalidating against the HTTP cache when enabled.
+        """
+        if self.cache:
+            return self.cache.get(self.session, feed_url, timeout=15).content
+        response = self.session.get(feed_url, timeout=15)
+        response.raise_for_status()
+        return response.content
+
+    def _poll_feed(self, feed_url):
+        """
+        Downloads and parses a single feed. Returns a list of entry dicts,
+        or None when the feed could not be downloaded or parsed.
+        """
+        logger.info(f"Checking feed: {feed_url}")
+        try:
+            feed = feedparser.parse(self._download(feed_url))
+            if feed.bozo and not feed.entries:
+                logger.error(f"Error parsing feed {feed_url}: {feed.bozo_exception}")
+                return None
+            if feed.bozo:
+                logger.warning(f"Feed {feed_url} is malformed, using {len(feed.entries)} recovered entries: {feed.bozo_exception}")
+
+            logger.info(f"Found {len(feed.entries)} entries in {feed_url}")
+
+            entries = []
+            for entry in feed.entries:
+                published = entry.get('published_parsed') or entry.get('updated_parsed')
+                entries.append({
+                    'guid': entry.get('id') or entry.get('link', ''),
+                    'title': entry.get('title', ''),
+                    'link': entry.get('link', ''),
+                    'summary': entry.get('summary', ''),
+                    'published': entry.get('published', ''),
+                    'published_ts': calendar.timegm(published) if published else None,
+                    'source': feed_url
+                })
+            return entries
+        except Exception as e:
+            logger.error(f"Error checking feed {feed_url}: {e}")
+            return None
+
+    def _poll_all(self, feed_urls):
+        """
+        Polls feeds in parallel, returning {feed_url: entries}.
+        """
+        if not feed_urls:
+            return {}
+        workers = min(self.max_workers, len(feed_urls))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return dict(zip(feed_urls, executor.map(self._poll_feed, feed_urls)))
+
     def fetch_feeds(self):
+        """
+        Returns every entry currently in every feed.
+        """
         all_entries = []
-        for feed_url in self.feeds:
-            logger.info(f"Checking feed: {feed_url}")
-            try:
-                feed = feedparser.parse(feed_url)
-                if feed.bozo:
-                    logger.warning(f"Error parsing feed {feed_url}: {feed.bozo_exception}")
-                    continue
-                
-                logger.info(f"Found {len(feed.entries)} entries in {feed_url}")
-                
-                for entry in feed.entries:
-                    all_entries.append({
-                        'title': entry.get('title', ''),
-                        'link': entry.get('link', ''),
-                        'summary': entry.get('summary', ''),
-                        'published': entry.get('published', ''),
-                        'source': feed_url
-                    })
-            except Exception as e:
-                logger.error(f"Error checking feed {feed_url}: {e}")
-        
+        for entries in self._poll_all(self.feeds).values():
+            all_entries.extend(entries or [])
         return all_entries
 
-    def run(self):
-        return self.fetch_feeds()
+    def fetch_new_entries(self, force=False):
+        """
+        Returns only entries not emitted by a previous call. Feeds whose adaptive
+        polling interval has not elapsed are skipped unless `force` is set.
+        Entries are ordered by triage score; with drop_low_signal, those below
+        the threshold are deferred and re-triaged on the next poll instead.
+        """
+        now = time.time()
+        due = [url for url in self.feeds if force or self.cursors.is_due(url, now)]
+        if len(due) < len(self.feeds):
+            logger.info(f"Skipping {len(self.feeds) - len(due)} feeds not yet due for polling")
+
+        new_entries = []
+        for feed_url, entries in self._poll_all(due).items():
+            if entries is None:
+                self.cursors.advance(feed_url, [], now, failed=True)
+                continue
+            cursor = self.cursors.get(feed_url)
+            seen = set(cursor['seen'])
+            deferred = set(cursor.get('deferred', []))
+            fresh = [
+                e for e in entries
+                if e['guid'] not in seen
+                and (e['published_ts'] is None or e['published_ts'] >= cursor['last_published'] or e['guid'] in deferred)
+            ]
+            logger.info(f"{len(fresh)} new entries in {feed_url}")
+            held_back = []
+            if self.triage and self.drop_low_signal and fresh:
+                fresh, held_back = self.triage.split(fresh, text=entry_text)
+                if held_back:
+                    logger.info(f"Triage held back {len(held_back)} low-signal entries in {feed_url}")
+            self.cursors.advance(feed_url, fresh, now, deferred=held_back)
+            new_entries.extend(fresh)
+
+        self.cursors.save()
+        if self.triage:
+            new_entries = self.triage.prioritize(new_entries, text=entry_text)
+        return new_entries
+
+    def run(self, force=False):
+        return self.fetch_new_entries(force=force)
 
 if __name__ == "__main__":
     reader = RSSReader()
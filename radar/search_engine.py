@@ -1,23 +1,137 @@
+import os
+import json
+import shutil
+import time
+import hashlib
+import threading
 import requests
+from collections import deque
+from datetime import date
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
 from bs4 import BeautifulSoup
-import time
-import random
 try:
     from execucao.utils import setup_logger
 except ImportError:
     # Fallback for direct execution
     import sys
-    import os
     sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
     from execucao.utils import setup_logger
 
+from radar.rate_limit import TokenBucket
+from radar.frontier import unwrap_redirect
+
 logger = setup_logger('SearchEngine')
 
+DEFAULT_SEARCH_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'temp', 'search_cache')
+
+# Requests per second and burst size allowed per engine
+ENGINE_RATE_LIMITS = {
+    'google': (0.5, 2),
+    'duckduckgo': (1.0, 3)
+}
+
+class SearchCache:
+    """
+    Caches search results on disk keyed by (engine, query, day).
+    The day is read on every lookup, and directories for previous days are
+    pruned on startup and whenever the date rolls over.
+    """
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir or DEFAULT_SEARCH_CACHE_DIR
+        self.day = None
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._today()
+
+    def _today(self):
+        today = date.today().isoformat()
+        if today != self.day:
+            with self._lock:
+                if today != self.day:
+                    self.day = today
+                    for name in os.listdir(self.cache_dir):
+                        if name != today:
+                            shutil.rmtree(os.path.join(self.cache_dir, name), ignore_errors=True)
+        return today
+
+    def _path(self, engine, query):
+        digest = hashlib.sha256(query.strip().lower().encode('utf-8')).hexdigest()[:32]
+        return os.path.join(self.cache_dir, self._today(), f"{engine}-{digest}.json")
+
+    def get(self, engine, query):
+        path = self._path(engine, query)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception:
+            return None
+
+    def put(self, engine, query, results):
+        path = self._path(engine, query)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f)
+        os.replace(tmp_path, path)
+
+
+class EngineLatencyStats:
+    """
+    Rolling window of successful response times for one search engine.
+    """
+    def __init__(self, window=50):
+        self.samples = deque(maxlen=window)
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    def record(self, seconds, ok):
+        with self._lock:
+            if ok:
+                self.samples.append(seconds)
+            else:
+                self.failures += 1
+
+    def percentile(self, pct):
+        with self._lock:
+            if not self.samples:
+                return None
+            ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def snapshot(self):
+        return {
+            'samples': len(self.samples),
+            'failures': self.failures,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95)
+        }
+
+
 class SearchAgent:
-    def __init__(self):
+    def __init__(self, max_workers=4, use_cache=True, hedge=False, hedge_delay=2.0,
+                 min_hedge_delay=0.5, max_hedge_delay=5.0):
         self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
         }
+        self.max_workers = max_workers
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        self.cache = SearchCache() if use_cache else None
+        # Per-engine rate limiting replaces the old fixed random sleep
+        self.limiters = {
+            engine: TokenBucket(rate, capacity) for engine, (rate, capacity) in ENGINE_RATE_LIMITS.items()
+        }
+
+        # Hedged mode: fire DuckDuckGo when Google is slower than its usual p95
+        self.hedge = hedge
+        self.hedge_delay = hedge_delay
+        self.min_hedge_delay = min_hedge_delay
+        self.max_hedge_delay = max_hedge_delay
+        self.latency = {engine: EngineLatencyStats() for engine in ENGINE_RATE_LIMITS}
+        self._hedge_pool = ThreadPoolExecutor(max_workers=max_workers * 2) if hedge else None
 
     def search_google(self, query, max_results=10):
         """
@@ -31,7 +145,7 @@ class SearchAgent:
         logger.info(f"Searching Google for: {query}")
         
         try:
-            response = requests.get(url, params=params, headers=self.headers, timeout=10)
+            response = self.session.get(url, params=params, timeout=10)
             response.raise_for_status()
             
             soup = BeautifulSoup(response.text, 'html.parser')
@@ -47,7 +161,7 @@ class SearchAgent:
                 if title_elem and link_elem:
                     results.append({
                         'title': title_elem.get_text(),
-                        'link': link_elem['href'],
+                        'link': unwrap_redirect(link_elem['href']),
                         'snippet': snippet_elem.get_text() if snippet_elem else "",
                         'source': 'google'
                     })
@@ -65,7 +179,7 @@ class SearchAgent:
                 if title_elem and link_elem:
                      results.append({
                         'title': title_elem.get_text(),
-                        'link': link_elem['href'],
+                        'link': unwrap_redirect(link_elem['href']),
                         'snippet': "",
                         'source': 'google'
                     })
@@ -88,7 +202,7 @@ class SearchAgent:
         logger.info(f"Searching DuckDuckGo for: {query}")
         
         try:
-            response = requests.post(url, data=data, headers=self.headers, timeout=10)
+            response = self.session.post(url, data=data, timeout=10)
             response.raise_for_status()
             
             soup = BeautifulSoup(response.text, 'html.parser')
@@ -101,7 +215,7 @@ class SearchAgent:
                 if not title_tag:
                     continue
                     
-                link = title_tag['href']
+                link = unwrap_redirect(title_tag['href'])
                 title = title_tag.get_text(strip=True)
                 snippet_tag = result.find('a', class_='result__snippet')
                 snippet = snippet_tag.get_text(strip=True) if snippet_tag else ""
@@ -120,19 +234,82 @@ class SearchAgent:
             logger.error(f"Error searching DuckDuckGo: {e}")
             return []
 
+    def _search(self, engine, query, acquired=False):
+        """
+        Runs one engine through the daily result cache. Empty results are not cached.
+        Takes the engine's rate-limit token unless the caller already `acquired` it;
+        only the request itself is timed, not the wait for the token.
+        """
+        if self.cache:
+            cached = self.cache.get(engine, query)
+            if cached is not None:
+                logger.info(f"Search cache hit ({engine}): {query}")
+                return cached
+
+        search = self.search_google if engine == 'google' else self.search_duckduckgo
+        if not acquired:
+            self.limiters[engine].acquire()
+        started = time.monotonic()
+        results = search(query)
+        self.latency[engine].record(time.monotonic() - started, bool(results))
+        if results and self.cache:
+            self.cache.put(engine, query, results)
+        return results
+
+    def current_hedge_delay(self):
+        """
+        Seconds to wait for Google before hedging: its observed p95, clamped,
+        or the configured default until enough samples exist.
+        """
+        stats = self.latency['google']
+        if len(stats.samples) < 5:
+            return self.hedge_delay
+        return min(self.max_hedge_delay, max(self.min_hedge_delay, stats.percentile(95)))
+
+    def run_hedged(self, query):
+        """
+        Sends the Google request and, if it has not answered within the hedge delay,
+        a DuckDuckGo request as well. The first non-empty result set wins; the
+        slower request is cancelled if it has not started and otherwise ignored.
+        """
+        for engine in ('google', 'duckduckgo'):
+            cached = self.cache.get(engine, query) if self.cache else None
+            if cached:
+                logger.info(f"Search cache hit ({engine}): {query}")
+                return cached
+
+        # The hedge timer starts once our own rate limit lets the request go out
+        self.limiters['google'].acquire()
+        google = self._hedge_pool.submit(self._search, 'google', query, acquired=True)
+        done, _ = wait([google], timeout=self.current_hedge_delay())
+        if done and google.result():
+            return google.result()
+
+        logger.info(f"Google slow or empty for '{query}'. Hedging with DuckDuckGo.")
+        duckduckgo = self._hedge_pool.submit(self._search, 'duckduckgo', query)
+        pending = {google, duckduckgo}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                results = future.result()
+                if results:
+                    for loser in pending:
+                        loser.cancel()
+                    return results
+        return []
 
     def run(self, query):
-        # Add random delay to be polite
-        time.sleep(random.uniform(1, 3))
-        
-        # Try Google First
-        results = self.search_google(query)
-        if results:
-            return results
-            
-        # Fallback to DuckDuckGo
-        logger.warning("Google search failed or empty. Falling back to DuckDuckGo.")
-        results = self.search_duckduckgo(query)
+        if self.hedge:
+            results = self.run_hedged(query)
+        else:
+            # Try Google First
+            results = self._search('google', query)
+            if results:
+                return results
+
+            # Fallback to DuckDuckGo
+            logger.warning("Google search failed or empty. Falling back to DuckDuckGo.")
+            results = self._search('duckduckgo', query)
         
         if not results:
             logger.warning("Search failed or returned 0 results. Returning MOCK results.")
@@ -152,6 +329,21 @@ class SearchAgent:
             ]
         return results
 
+    def run_many(self, queries, max_workers=None):
+        """
+        Runs several queries concurrently; the per-engine token buckets keep the
+        request rate polite. Yields (query, results) as each query finishes.
+        """
+        queries = list(dict.fromkeys(queries))
+        if not queries:
+            return
+
+        workers = min(max_workers or self.max_workers, len(queries))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(self.run, query): query for query in queries}
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+
 if __name__ == "__main__":
     agent = SearchAgent()
     results = agent.run("how to automate content creation")
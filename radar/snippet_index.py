@@ -0,0 +1,185 @@
+import os
+import json
+import math
+import hashlib
+import threading
+from collections import Counter
+try:
+    from execucao.utils import setup_logger
+    from execucao.tokens import estimate_tokens
+except ImportError:
+    import sys
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from execucao.utils import setup_logger
+    from execucao.tokens import estimate_tokens
+
+from radar.chunking import chunk_text
+from radar.clustering import tokenize
+
+logger = setup_logger('SnippetIndex')
+
+DEFAULT_SNIPPET_INDEX_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'temp', 'competitor_snippets.json')
+
+# Snippets are small so a budget can mix evidence from many competitors
+SNIPPET_TOKENS = 200
+SNIPPET_OVERLAP_TOKENS = 30
+
+
+class BM25Index:
+    """
+    Inverted BM25 index over chunked competitor pages.
+    Pages are added incrementally by source (usually the URL); re-adding a
+    source replaces its snippets only when the text changed. With `path` set
+    the snippets are persisted and the postings rebuilt on load.
+    """
+    def __init__(self, path=None, k1=1.5, b=0.75, snippet_tokens=SNIPPET_TOKENS, overlap_tokens=SNIPPET_OVERLAP_TOKENS):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self.snippet_tokens = snippet_tokens
+        self.overlap_tokens = overlap_tokens
+        self._lock = threading.Lock()
+
+        self.snippets = {}   # snippet id -> {'source', 'text', 'length'}
+        self.sources = {}    # source -> {'hash', 'ids'}
+        self.postings = {}   # term -> {snippet id: term frequency}
+        self.total_length = 0
+        self._next_id = 0
+        self._load()
+
+    def __len__(self):
+        return len(self.snippets)
+
+    def add_document(self, source, text):
+        """
+        Indexes `text` under `source`. Returns the number of new snippets
+        (0 when the source is already indexed with identical text).
+        """
+        digest = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        with self._lock:
+            existing = self.sources.get(source)
+            if existing and existing['hash'] == digest:
+                return 0
+            if existing:
+                self._remove(source)
+
+            ids = []
+            for chunk in chunk_text(text, self.snippet_tokens, self.overlap_tokens):
+                terms = tokenize(chunk)
+                if not terms:
+                    continue
+                snippet_id = self._next_id
+                self._next_id += 1
+                self._index(snippet_id, source, chunk, terms)
+                ids.append(snippet_id)
+            self.sources[source] = {'hash': digest, 'ids': ids}
+            return len(ids)
+
+    def remove_document(self, source):
+        with self._lock:
+            self._remove(source)
+
+    def _index(self, snippet_id, source, text, terms):
+        self.snippets[snippet_id] = {'source': source, 'text': text, 'length': len(terms)}
+        self.total_length += len(terms)
+        for term, count in Counter(terms).items():
+            self.postings.setdefault(term, {})[snippet_id] = count
+
+    def _remove(self, source):
+        entry = self.sources.pop(source, None)
+        if not entry:
+            return
+        for snippet_id in entry['ids']:
+            snippet = self.snippets.pop(snippet_id)
+            self.total_length -= snippet['length']
+            for term in set(tokenize(snippet['text'])):
+                docs = self.postings.get(term)
+                if docs is None:
+                    continue
+                docs.pop(snippet_id, None)
+                if not docs:
+                    del self.postings[term]
+
+    def search(self, query, k=10):
+        """
+        Returns up to `k` (score, snippet) pairs for `query`, best first.
+        Only snippets sharing at least one query term are scored.
+        """
+        terms = set(tokenize(query))
+        with self._lock:
+            n = len(self.snippets)
+            if not n or not terms:
+                return []
+            avg_length = self.total_length / n
+            scores = {}
+            for term in terms:
+                docs = self.postings.get(term)
+                if not docs:
+                    continue
+                idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+                for snippet_id, tf in docs.items():
+                    length = self.snippets[snippet_id]['length']
+                    norm = tf + self.k1 * (1 - self.b + self.b * length / avg_length)
+                    scores[snippet_id] = scores.get(snippet_id, 0.0) + idf * tf * (self.k1 + 1) / norm
+            best = sorted(scores.items(), key=lambda kv: (-kv[1], kv[0]))[:k]
+            return [(score, dict(self.snippets[snippet_id], id=snippet_id)) for snippet_id, score in best]
+
+    def top_snippets(self, query, k=12, max_tokens=1500):
+        """
+        Best-matching snippets for `query` that fit in `max_tokens`, at most `k`.
+        Returns a list of {'source', 'text', 'score'}.
+        """
+        selected, used = [], 0
+        for score, snippet in self.search(query, k):
+            tokens = estimate_tokens(snippet['text'])
+            if used + tokens > max_tokens:
+                continue
+            selected.append({'source': snippet['source'], 'text': snippet['text'], 'score': round(score, 3)})
+            used += tokens
+        return selected
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.warning(f"Discarding unreadable snippet index: {e}")
+            return
+        for source, entry in data.get('sources', {}).items():
+            ids = []
+            for text in entry['snippets']:
+                snippet_id = self._next_id
+                self._next_id += 1
+                self._index(snippet_id, source, text, tokenize(text))
+                ids.append(snippet_id)
+            self.sources[source] = {'hash': entry['hash'], 'ids': ids}
+
+    def save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._lock:
+            data = {
+                source: {'hash': entry['hash'], 'snippets': [self.snippets[i]['text'] for i in entry['ids']]}
+                for source, entry in self.sources.items()
+            }
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'sources': data}, f)
+            os.replace(tmp_path, self.path)
+
+
+_default_index = None
+_default_index_lock = threading.Lock()
+
+def get_default_snippet_index():
+    """
+    Process-wide persisted competitor snippet index.
+    """
+    global _default_index
+    with _default_index_lock:
+        if _default_index is None:
+            _default_index = BM25Index(DEFAULT_SNIPPET_INDEX_PATH)
+        return _default_index
@@ -0,0 +1,145 @@
+import os
+import re
+import json
+
+import numpy as np
+try:
+    from execucao.utils import setup_logger
+except ImportError:
+    import sys
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from execucao.utils import setup_logger
+
+from radar.ranking import RADAR_DIRECTIVES, load_criteria
+
+logger = setup_logger('PainTriage')
+
+DEFAULT_LEXICON_PATH = os.path.join(RADAR_DIRECTIVES, 'triage_lexicon.json')
+# Shorter texts are scored as if they were this long, so one incidental
+# phrase in a title or snippet does not read as a dense pain signal
+MIN_CHARS = 1000
+
+
+def load_lexicon(path=None):
+    """
+    Reads the triage lexicon and checks its categories against the criteria
+    in pain_criteria.json.
+    """
+    with open(path or DEFAULT_LEXICON_PATH, 'r', encoding='utf-8') as f:
+        lexicon = json.load(f)
+
+    criteria = set(load_criteria())
+    covered = {c.get('criterion') for c in lexicon['categories'].values()}
+    for name, category in lexicon['categories'].items():
+        if category.get('criterion') and category['criterion'] not in criteria:
+            logger.warning(f"Triage category '{name}' maps to unknown criterion '{category['criterion']}'")
+    missing = criteria - covered
+    if missing:
+        logger.warning(f"No triage signals for criteria: {sorted(missing)}")
+    return lexicon
+
+
+class PainTriage:
+    """
+    Local pre-filter run before LLM extraction. Each lexicon category is one
+    compiled regex; a text's match counts form a row of a (texts x categories)
+    matrix and its score is the weighted match count per 1000 characters
+    (counts @ weights), so long pages need proportionally more evidence and
+    promotional phrasing counts against it.
+    Callers order work by score and only drop texts below `threshold` when
+    asked to; the threshold is calibrated with benchmarks/triage_bench.py
+    on page-sized documents.
+    """
+    def __init__(self, threshold=None, lexicon=None, min_chars=MIN_CHARS):
+        lexicon = lexicon or load_lexicon()
+        categories = lexicon['categories']
+        self.categories = list(categories)
+        self.criteria = [categories[name].get('criterion') for name in self.categories]
+        self.weights = np.array([categories[name]['weight'] for name in self.categories], dtype=np.float32)
+        self.patterns = [
+            re.compile(r'(?<!\w)(?:' + '|'.join(categories[name]['patterns']) + r')', re.IGNORECASE)
+            for name in self.categories
+        ]
+        self.threshold = float(lexicon.get('threshold', 0.8) if threshold is None else threshold)
+        self.min_chars = min_chars
+
+    def features(self, texts):
+        """
+        Match counts per text and category as a float32 matrix.
+        """
+        counts = np.zeros((len(texts), len(self.categories)), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for col, pattern in enumerate(self.patterns):
+                counts[row, col] = len(pattern.findall(text or ''))
+        return counts
+
+    def densities(self, texts):
+        """
+        Match counts per 1000 characters (texts shorter than `min_chars` count as `min_chars`).
+        """
+        lengths = np.array([max(len(text or ''), self.min_chars) for text in texts], dtype=np.float32)
+        return self.features(texts) * (1000 / lengths)[:, None]
+
+    def scores(self, texts):
+        if not texts:
+            return np.zeros(0, dtype=np.float32)
+        return self.densities(texts) @ self.weights
+
+    def score(self, text):
+        return float(self.scores([text])[0])
+
+    def explain(self, text):
+        """
+        Score plus the matching categories and the per-criterion signal they add up to.
+        """
+        counts = self.features([text])[0]
+        contributions = counts * (1000 / max(len(text or ''), self.min_chars)) * self.weights
+        by_criterion = {}
+        for criterion, value in zip(self.criteria, contributions):
+            if criterion and value:
+                by_criterion[criterion] = round(by_criterion.get(criterion, 0.0) + float(value), 3)
+        return {
+            'score': round(float(contributions.sum()), 3),
+            'categories': {name: int(c) for name, c in zip(self.categories, counts) if c},
+            'criteria': by_criterion
+        }
+
+    def split(self, items, text=None):
+        """
+        Splits items into (kept, dropped) by the threshold, preserving order.
+        `text` extracts the text from an item (default: the item itself).
+        """
+        text = text or (lambda item: item)
+        scores = self.scores([text(item) for item in items])
+        kept = [item for item, s in zip(items, scores) if s >= self.threshold]
+        dropped = [item for item, s in zip(items, scores) if s < self.threshold]
+        return kept, dropped
+
+    def prioritize(self, items, text=None):
+        """
+        Items sorted by triage score, strongest pain signal first.
+        """
+        text = text or (lambda item: item)
+        scores = self.scores([text(item) for item in items])
+        order = np.argsort(-scores, kind='stable')
+        return [items[i] for i in order]
+
+    def evaluate(self, texts, labels, threshold=None):
+        """
+        Precision/recall of keeping a text against 0/1 labels (1 = has pain points),
+        and the share of texts that would still reach the LLM.
+        """
+        threshold = self.threshold if threshold is None else threshold
+        predicted = self.scores(texts) >= threshold
+        actual = np.asarray(labels, dtype=bool)
+        true_pos = int(np.sum(predicted & actual))
+        precision = true_pos / int(predicted.sum()) if predicted.any() else 0.0
+        recall = true_pos / int(actual.sum()) if actual.any() else 0.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        return {
+            'threshold': threshold,
+            'precision': round(precision, 3),
+            'recall': round(recall, 3),
+            'f1': round(f1, 3),
+            'kept_fraction': round(float(predicted.mean()), 3) if len(texts) else 0.0
+        }